@@ -0,0 +1,87 @@
+# End-of-day / end-of-month sales reports: the columnar store with NumPy
+# against the same report as a Python loop over the orders' Burger lines.
+#
+#     python benchmarks/analytics.py --days 30 --orders-per-day 400
+
+import argparse
+import os
+import random
+import sys
+import time
+
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from burger import Order, populate_menu
+from burger.analytics import SalesStore
+from burger.simulation import random_line
+
+
+def build_orders(days, orders_per_day, seed):
+    rng = random.Random(seed)
+    menu = populate_menu()
+    start = time.time() - days * 86400
+    orders = []
+    for day in range(days):
+        for index in range(orders_per_day):
+            order = Order(f"sales-{day}-{index}")
+            for _ in range(rng.randint(1, 4)):
+                order.add_burger(random_line(rng, menu.burgers, menu.options))
+            order.confirmed_at = start + day * 86400 + rng.uniform(11, 22) * 3600
+            order.completed_at = order.confirmed_at + rng.gauss(480, 180)
+            orders.append(order)
+    return orders
+
+
+def loop_report(orders):
+    hourly = Counter()
+    options = Counter()
+    added = Counter()
+    removed = Counter()
+    durations = []
+    total = 0
+    for order in orders:
+        hour = time.localtime(order.completed_at).tm_hour
+        total += order.subtotal_cents
+        durations.append(order.completed_at - order.confirmed_at)
+        for burger, count in order.lines.items():
+            hourly[burger.name, hour] += count
+            for option in burger.additional_options:
+                options[option] += count
+            for ingredient in burger.added_ingredients:
+                added[burger.name, ingredient] += count
+            for ingredient in burger.removed_ingredients:
+                removed[burger.name, ingredient] += count
+    durations.sort()
+    return hourly, options, added, removed, total / len(orders), durations[len(durations) // 2]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sales report benchmark")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--orders-per-day", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    orders = build_orders(args.days, args.orders_per_day, args.seed)
+    store = SalesStore()
+    store.report().summary()  # first NumPy calls pay one-off setup costs
+    _, ingest_ms = timed(lambda: [store.add_order(order) for order in orders])
+    summary, columnar_ms = timed(lambda: store.report().summary())
+    _, loop_ms = timed(lambda: loop_report(orders))
+    day_start = orders[-1].completed_at - 86400
+    _, day_ms = timed(lambda: store.report(since=day_start).summary())
+
+    print(f"{len(orders)} orders, {len(store.lines['item'])} lines")
+    print(f"ingest:            {ingest_ms:8.2f} ms")
+    print(f"columnar report:   {columnar_ms:8.2f} ms")
+    print(f"last day report:   {day_ms:8.2f} ms")
+    print(f"python loop:       {loop_ms:8.2f} ms")
+    print(f"average ticket:    ${summary['average_ticket_cents'] / 100:.2f}")
@@ -0,0 +1,163 @@
+# Headless benchmarks for the order model and ticket rendering hot paths.
+#
+#     python benchmarks/hot_paths.py --output bench.json
+#
+# Every case is timed over several rounds; the JSON keeps per-call
+# mean/p50/min in microseconds plus enough metadata to compare runs.
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from burger import Order, TicketRenderer, get_default_options, populate_menu
+from burger.simulation import random_line
+
+LINES_PER_ORDER = (1, 10, 100, 1000)
+OPEN_ORDERS = (5, 50, 500)
+
+
+def build_order(menu, options, size, rng):
+    order = Order(f"bench-{size}-{rng.random()}")
+    for _ in range(size):
+        order.add_burger(random_line(rng, menu.burgers, options))
+    return order
+
+
+def measure(fn, rounds, min_round_time):
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round_time or number >= 1 << 20:
+            break
+        number *= 2
+    samples = [elapsed / number]
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return {
+        "calls_per_round": number,
+        "rounds": rounds,
+        "mean_us": statistics.mean(samples) * 1e6,
+        "p50_us": statistics.median(samples) * 1e6,
+        "min_us": min(samples) * 1e6,
+    }
+
+
+def run(rounds, min_round_time, seed):
+    rng = random.Random(seed)
+    menu = populate_menu()
+    options = get_default_options()
+    results = []
+
+    def record(name, fn, **params):
+        result = {"name": name, "params": params}
+        result.update(measure(fn, rounds, min_round_time))
+        results.append(result)
+        print(f"{name:<40}{json.dumps(params):<28}{result['p50_us']:>12.3f} us")
+
+    line = random_line(rng, menu.burgers, options)
+    twin = line.modified()
+    record("burger_hash", lambda: hash(line))
+    record("burger_eq", lambda: line == twin)
+
+    for size in LINES_PER_ORDER:
+        order = build_order(menu, options, size, rng)
+        renderer = TicketRenderer(menu)
+        burger = next(iter(order.lines))
+        record("order_count_identical_burgers", order.count_identical_burgers, lines=size)
+        record("order_total_price", order.total_price, lines=size)
+        record(
+            "order_add_remove_burger",
+            lambda order=order, burger=burger: (
+                order.add_burger(burger),
+                order.remove_burger(burger),
+            ),
+            lines=size,
+        )
+
+        def render_cold(order=order, renderer=renderer):
+            renderer.ticket_cache.clear()
+            renderer.line_cache.clear()
+            renderer.construct_order_display(order)
+
+        record("construct_order_display_cold", render_cold, lines=size)
+        record(
+            "construct_order_display_cached",
+            lambda order=order, renderer=renderer: renderer.construct_order_display(order),
+            lines=size,
+        )
+        record(
+            "get_ingredient_modifications",
+            lambda burger=burger, renderer=renderer: renderer.get_ingredient_modifications(burger),
+            lines=size,
+        )
+        record(
+            "summary_rows",
+            lambda order=order, renderer=renderer: renderer.summary_rows(order),
+            lines=size,
+        )
+
+    for open_orders in OPEN_ORDERS:
+        orders = [build_order(menu, options, rng.randint(1, 6), rng) for _ in range(open_orders)]
+        renderer = TicketRenderer(menu)
+
+        def rail_cold(orders=orders, renderer=renderer):
+            renderer.ticket_cache.clear()
+            renderer.line_cache.clear()
+            for order in orders:
+                renderer.construct_order_display(order)
+
+        def rail_cached(orders=orders, renderer=renderer):
+            for order in orders:
+                renderer.construct_order_display(order)
+
+        record("render_rail_cold", rail_cold, open_orders=open_orders)
+        record("render_rail_cached", rail_cached, open_orders=open_orders)
+    return results
+
+
+def metadata():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "timestamp": time.time(),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Order model and rendering benchmarks")
+    parser.add_argument("--output", default="bench.json")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-round-time", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    results = run(args.rounds, args.min_round_time, args.seed)
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump({"meta": metadata(), "results": results}, output, indent=2)
+    print(f"wrote {len(results)} results to {args.output}")
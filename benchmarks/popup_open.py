@@ -0,0 +1,79 @@
+# Open latency of the order-entry and modify popups.
+#
+# "rebuild" drops the popup before every open, which is what the app used to
+# do on every tap; "pooled" reuses the popup built on the first open.
+#
+#     python benchmarks/popup_open.py --repeat 200
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def time_opens(app, open_popup, dismiss, reset, repeat):
+    samples = []
+    for _ in range(repeat):
+        if reset:
+            reset()
+        start = time.perf_counter()
+        open_popup()
+        samples.append((time.perf_counter() - start) * 1000)
+        dismiss()
+    return samples
+
+
+def main_benchmark(repeat):
+    app = main.BurgerApp()
+    app.build()
+    item = max(app.menu.burgers, key=lambda item: len(item.ingredients))
+
+    def open_add():
+        app.open_add_order_popup()
+
+    def dismiss_add():
+        app.add_order_popup.dismiss()
+
+    def reset_add():
+        app.add_order_popup = None
+
+    def open_modify():
+        app.open_modify_item_popup(item.clone())
+
+    def dismiss_modify():
+        app.modify_item_popup.dismiss()
+
+    def reset_modify():
+        app.modify_item_popup = None
+
+    cases = [
+        ("add_order_popup", open_add, dismiss_add, reset_add),
+        ("modify_item_popup", open_modify, dismiss_modify, reset_modify),
+    ]
+    print(f"{'popup':<20}{'mode':<10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, open_popup, dismiss, reset in cases:
+        for mode, reset_fn in (("rebuild", reset), ("pooled", None)):
+            samples = time_opens(app, open_popup, dismiss, reset_fn, repeat)
+            print(
+                f"{name:<20}{mode:<10}"
+                f"{statistics.mean(samples):>10.3f}"
+                f"{percentile(samples, 0.5):>10.3f}"
+                f"{percentile(samples, 0.95):>10.3f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Popup open latency benchmark")
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+    main_benchmark(args.repeat)
@@ -0,0 +1,18 @@
+from .core import (
+    DEFAULT_MENU,
+    DEFAULT_OPTIONS,
+    INGREDIENTS,
+    OPTIONS,
+    ArchivedOrder,
+    Burger,
+    InternTable,
+    Menu,
+    MenuItem,
+    Order,
+    OrderRegistry,
+    OrderState,
+    get_default_options,
+    populate_menu,
+)
+from .engine import OrderEngine, OrderListener
+from .render import RenderCache, TicketRenderer
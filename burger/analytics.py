@@ -0,0 +1,294 @@
+import logging
+import os
+import pickle
+import time
+
+from array import array
+from dataclasses import dataclass
+
+from .core import OPTIONS, mask_bits
+from .engine import OrderListener
+
+try:
+    import numpy as np
+except ImportError:  # the store works without it, only the reports need it
+    np = None
+
+logger = logging.getLogger(__name__)
+
+LINE_COLUMNS = {
+    "order_row": "q",
+    "item": "q",
+    "quantity": "q",
+    "cents": "q",
+    "completed_at": "d",
+    "added_mask": "Q",
+    "removed_mask": "Q",
+    "options_mask": "Q",
+}
+ORDER_COLUMNS = {
+    "confirmed_at": "d",
+    "completed_at": "d",
+    "total_cents": "q",
+    "item_count": "q",
+}
+
+
+@dataclass(frozen=True)
+class HourlySales:
+    item_names: list
+    quantity: object  # items x 24 array
+    cents: object
+
+
+class SalesStore(OrderListener):
+    # Completed orders flattened into typed columns, one row per order line
+    # plus one per order. Appending is a handful of array appends; reports
+    # load each column into NumPy in one copy.
+    def __init__(self):
+        self.lines = {name: array(code) for name, code in LINE_COLUMNS.items()}
+        self.orders = {name: array(code) for name, code in ORDER_COLUMNS.items()}
+        # Items get a store-local code, since MenuItem ids are per process
+        # and per menu load; the key keeps what the positional masks need.
+        self.item_codes = {}
+        self.items = []
+
+    def __len__(self):
+        return len(self.orders["total_cents"])
+
+    def order_completed(self, order):
+        self.add_order(order)
+
+    def add_order(self, order):
+        self.add_completed(
+            order.confirmed_at,
+            order.completed_at or time.time(),
+            order.subtotal_cents,
+            order.item_count,
+            order.lines.items(),
+        )
+
+    def add_completed(self, confirmed_at, completed_at, total_cents, item_count, order_lines):
+        order_row = len(self)
+        orders = self.orders
+        orders["confirmed_at"].append(
+            confirmed_at if confirmed_at is not None else float("nan")
+        )
+        orders["completed_at"].append(completed_at)
+        orders["total_cents"].append(total_cents)
+        orders["item_count"].append(item_count)
+
+        lines = self.lines
+        for burger, count in order_lines:
+            item = burger.item
+            item_key = (item.name, item.ingredients)
+            code = self.item_codes.get(item_key)
+            if code is None:
+                code = self.item_codes[item_key] = len(self.items)
+                self.items.append(item_key)
+            lines["order_row"].append(order_row)
+            lines["item"].append(code)
+            lines["quantity"].append(count)
+            lines["cents"].append(item.price_cents * count)
+            lines["completed_at"].append(completed_at)
+            lines["added_mask"].append(burger.added_mask)
+            lines["removed_mask"].append(burger.removed_mask)
+            lines["options_mask"].append(burger.options_mask)
+
+    def catch_up(self, history, menu):
+        # The store is only saved on a clean stop; the order history has
+        # every completion, so anything completed since the last save (or
+        # everything, if the save was lost) is replayed from it.
+        completed = self.orders["completed_at"]
+        since = max(completed) if completed else None
+        replayed = 0
+        for entry in history.completed_after(since):
+            order_lines = []
+            for line in entry.lines:
+                try:
+                    burger = menu.line_from_record(line[:4], line[5] if len(line) > 5 else None)
+                except KeyError:
+                    logger.warning("%s is no longer on the menu, left out of sales", line[0])
+                    continue
+                order_lines.append((burger, line[4]))
+            self.add_completed(
+                entry.confirmed_at,
+                entry.completed_at,
+                entry.subtotal_cents,
+                entry.item_count,
+                order_lines,
+            )
+            replayed += 1
+        return replayed
+
+    def save(self, path):
+        # Written aside and swapped in, so a crash mid-save leaves the last
+        # good file.
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "wb") as output:
+            pickle.dump(
+                {
+                    "lines": self.lines,
+                    "orders": self.orders,
+                    "items": self.items,
+                    "options": list(OPTIONS.names),
+                },
+                output,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+            output.flush()
+            os.fsync(output.fileno())
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path):
+        # A missing or unreadable file gives an empty store; catch_up() then
+        # rebuilds it from the order history.
+        try:
+            with open(path, "rb") as source:
+                data = pickle.load(source)
+        except FileNotFoundError:
+            return cls()
+        except Exception:
+            logger.exception("could not read sales from %s, starting empty", path)
+            return cls()
+        store = cls()
+        store.lines = data["lines"]
+        store.orders = data["orders"]
+        store.items = data["items"]
+        store.item_codes = {item_key: code for code, item_key in enumerate(store.items)}
+        # Option bits are per process; remap the saved ones onto ours.
+        remap = {bit: OPTIONS.intern(name) for bit, name in enumerate(data["options"])}
+        if any(bit != new_bit for bit, new_bit in remap.items()):
+            store.lines["options_mask"] = array(
+                "Q",
+                (
+                    sum(1 << remap[bit] for bit in mask_bits(mask))
+                    for mask in store.lines["options_mask"]
+                ),
+            )
+        return store
+
+    def report(self, since=None, until=None, utc_offset=None):
+        return SalesReport(self, since, until, utc_offset)
+
+
+class SalesReport:
+    # Vectorised reports over a SalesStore, optionally limited to orders
+    # completed in [since, until).
+    def __init__(self, store, since=None, until=None, utc_offset=None):
+        if np is None:
+            raise RuntimeError("sales reports need numpy")
+        self.store = store
+        self.utc_offset = time.localtime().tm_gmtoff if utc_offset is None else utc_offset
+        # Copies, not views: an exported buffer would stop the store's arrays
+        # from growing while the report is alive. A memcpy per column.
+        self.lines = self.columns(store.lines, since, until)
+        self.orders = self.columns(store.orders, since, until)
+
+    @staticmethod
+    def columns(table, since, until):
+        columns = {
+            name: np.array(column, dtype=column.typecode)
+            for name, column in table.items()
+        }
+        if since is None and until is None:
+            return columns
+        timestamps = columns["completed_at"]
+        selected = np.ones(len(timestamps), dtype=bool)
+        if since is not None:
+            selected &= timestamps >= since
+        if until is not None:
+            selected &= timestamps < until
+        return {name: column[selected] for name, column in columns.items()}
+
+    def total_cents(self):
+        return int(self.orders["total_cents"].sum())
+
+    def average_ticket_cents(self):
+        totals = self.orders["total_cents"]
+        return float(totals.mean()) if len(totals) else 0.0
+
+    def sales_by_item_per_hour(self):
+        codes, item_rows = np.unique(self.lines["item"], return_inverse=True)
+        hours = (
+            (self.lines["completed_at"] + self.utc_offset) // 3600 % 24
+        ).astype(np.int64)
+        cells = item_rows * 24 + hours
+        size = len(codes) * 24
+        quantity = np.bincount(cells, weights=self.lines["quantity"], minlength=size)
+        cents = np.bincount(cells, weights=self.lines["cents"], minlength=size)
+        return HourlySales(
+            item_names=[self.store.items[int(code)][0] for code in codes],
+            quantity=quantity.reshape(-1, 24).astype(np.int64),
+            cents=cents.reshape(-1, 24).astype(np.int64),
+        )
+
+    def modifier_frequency(self):
+        # Quantities sold with each option, and with each ingredient added
+        # or removed (ingredient bits are positions within their item).
+        quantity = self.lines["quantity"]
+        options_mask = self.lines["options_mask"]
+        options = {}
+        for bit in range(int(options_mask.max()).bit_length() if len(options_mask) else 0):
+            bit_set = (options_mask >> np.uint64(bit)) & np.uint64(1) == 1
+            count = int(quantity[bit_set].sum())
+            if count:
+                options[OPTIONS.names[bit]] = count
+
+        added = {}
+        removed = {}
+        items = self.lines["item"]
+        for code in np.unique(items):
+            name, ingredients = self.store.items[int(code)]
+            selected = items == code
+            item_quantity = quantity[selected]
+            for target, masks in (
+                (added, self.lines["added_mask"][selected]),
+                (removed, self.lines["removed_mask"][selected]),
+            ):
+                for position, ingredient in enumerate(ingredients):
+                    bit_set = (masks >> np.uint64(position)) & np.uint64(1) == 1
+                    count = int(item_quantity[bit_set].sum())
+                    if count:
+                        target[(name, ingredient)] = count
+        return {"options": options, "added": added, "removed": removed}
+
+    def time_to_complete(self):
+        durations = self.orders["completed_at"] - self.orders["confirmed_at"]
+        durations = durations[~np.isnan(durations)]
+        if not len(durations):
+            return {"count": 0}
+        p50, p90, p99 = np.percentile(durations, (50, 90, 99))
+        return {
+            "count": int(len(durations)),
+            "mean_s": float(durations.mean()),
+            "p50_s": float(p50),
+            "p90_s": float(p90),
+            "p99_s": float(p99),
+            "max_s": float(durations.max()),
+        }
+
+    def summary(self):
+        hourly = self.sales_by_item_per_hour()
+        return {
+            "orders": int(len(self.orders["total_cents"])),
+            "total_cents": self.total_cents(),
+            "average_ticket_cents": self.average_ticket_cents(),
+            "time_to_complete": self.time_to_complete(),
+            "items": {
+                name: {
+                    "quantity": int(hourly.quantity[row].sum()),
+                    "cents": int(hourly.cents[row].sum()),
+                    "by_hour": hourly.quantity[row].tolist(),
+                }
+                for row, name in enumerate(hourly.item_names)
+            },
+            "modifiers": {
+                kind: {
+                    " / ".join(key) if isinstance(key, tuple) else key: count
+                    for key, count in counts.items()
+                }
+                for kind, counts in self.modifier_frequency().items()
+            },
+        }
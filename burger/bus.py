@@ -0,0 +1,449 @@
+import argparse
+import asyncio
+import collections
+import json
+import logging
+import struct
+import threading
+import time
+
+from dataclasses import dataclass
+
+from .core import Order
+from .engine import OrderListener
+
+logger = logging.getLogger(__name__)
+
+# Confirmed orders are never edited, so there is no modified event; 2 is
+# left unused to keep the wire kinds stable.
+ORDER_CREATED = 1
+ORDER_COMPLETED = 3
+# A kitchen station finished its lines of an order; the other stations mark
+# them done so whichever finishes last completes the order.
+STATION_DONE = 4
+
+FRAME_HEADER = struct.Struct("!I")
+MAX_FRAME_SIZE = 1 << 20
+
+
+class BusFull(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class OrderEvent:
+    kind: int
+    order_id: str
+    customer_name: str = None
+    lines: tuple = ()
+    sent_at: float = 0.0
+    station: str = None
+
+    @classmethod
+    def from_order(cls, kind, order):
+        lines = ()
+        if kind != ORDER_COMPLETED:
+            # Lines carry the price they were rung up at, as in the journal.
+            lines = tuple(
+                (burger.to_record(), count, burger.price_cents)
+                for burger, count in order.lines.items()
+            )
+        return cls(kind, order.order_id, order.customer_name, lines, time.time())
+
+    @classmethod
+    def station_done(cls, order_id, station):
+        return cls(STATION_DONE, order_id, sent_at=time.time(), station=station)
+
+    def to_wire(self):
+        wire = [
+            self.kind,
+            self.order_id,
+            self.customer_name,
+            self.sent_at,
+            [record + [count, price_cents] for record, count, price_cents in self.lines],
+        ]
+        if self.station is not None:
+            wire.append(self.station)
+        return wire
+
+    @classmethod
+    def from_wire(cls, wire):
+        kind, order_id, customer_name, sent_at, lines = wire[:5]
+        return cls(
+            kind,
+            order_id,
+            customer_name,
+            tuple((line[:4], line[4], line[5] if len(line) > 5 else None) for line in lines),
+            sent_at,
+            wire[5] if len(wire) > 5 else None,
+        )
+
+
+def encode_batch(events):
+    # One frame per batch: a 4-byte length and a compact JSON array of events.
+    payload = json.dumps(
+        [event.to_wire() for event in events], separators=(",", ":")
+    ).encode()
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def decode_batch(payload):
+    return [OrderEvent.from_wire(wire) for wire in json.loads(payload)]
+
+
+async def read_frame(reader):
+    (size,) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    if size > MAX_FRAME_SIZE:
+        raise ValueError(f"frame of {size} bytes is over the {MAX_FRAME_SIZE} limit")
+    return await reader.readexactly(size)
+
+
+def apply_event(engine, menu, event):
+    # Mirror a remote event into the local engine without notifying its
+    # listeners, and return the order whose ticket changed.
+    if event.kind == ORDER_COMPLETED:
+        return engine.order_complete(event.order_id, notify=False)
+    if event.kind == STATION_DONE:
+        return engine.existing_orders.get(event.order_id)
+    # Resolve every line before touching the order. With live menu reloads
+    # the sender may know an item this terminal hasn't loaded yet; like
+    # journal recovery, such lines are logged and left off.
+    lines = []
+    for record, count, price_cents in event.lines:
+        try:
+            lines.append((menu.line_from_record(record, price_cents), count))
+        except KeyError:
+            logger.warning("%s is not on this menu, dropped from %s", record[0], event.order_id)
+    order = Order(event.order_id)
+    order.clear()
+    if event.customer_name:
+        order.customer_name = event.customer_name
+    if order.confirmed_at is None:
+        order.confirmed_at = event.sent_at
+    for burger, count in lines:
+        order.add_burger(burger, count)
+    return engine.receive_order(order)
+
+
+def apply_station_done(engine, scheduler, event):
+    # Retire another station's lines of an order in the local scheduler.
+    # Returns the order and whether no station has anything left for it.
+    order = engine.existing_orders.get(event.order_id)
+    if order is None:
+        return None, False
+    # The order may have arrived in the same batch, before the rail (and
+    # with it the scheduler) caught up.
+    scheduler.update(order)
+    return order, scheduler.finish(order.order_id, event.station)
+
+
+class OrderBroker:
+    # Loopback stand-in for the shop's broker: every frame a terminal sends
+    # is relayed unchanged to every other connected terminal. Each terminal
+    # has a bounded outbox; when one is full the broker stops reading from
+    # the sender, so TCP pushes back on it, and a terminal that stays full
+    # past stall_timeout is disconnected instead of stalling everyone.
+    def __init__(self, host="127.0.0.1", port=0, queue_size=256, stall_timeout=5.0):
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.stall_timeout = stall_timeout
+        self.server = None
+        self.connections = {}
+        self.handlers = set()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        self.server.close()
+        for writer in list(self.connections):
+            writer.close()
+        # Closed connections read EOF, so the handlers finish on their own.
+        await asyncio.gather(*self.handlers, return_exceptions=True)
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        outbox = asyncio.Queue(self.queue_size)
+        self.connections[writer] = outbox
+        self.handlers.add(asyncio.current_task())
+        sender = asyncio.create_task(self._send(writer, outbox))
+        try:
+            while True:
+                frame = await read_frame(reader)
+                for other, other_outbox in list(self.connections.items()):
+                    if other is writer:
+                        continue
+                    try:
+                        await asyncio.wait_for(
+                            other_outbox.put(frame), self.stall_timeout
+                        )
+                    except asyncio.TimeoutError:
+                        logger.warning("dropping order bus terminal that stopped reading")
+                        self.connections.pop(other, None)
+                        other.close()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self.connections.pop(writer, None)
+            self.handlers.discard(asyncio.current_task())
+            sender.cancel()
+            writer.close()
+
+    async def _send(self, writer, outbox):
+        try:
+            while True:
+                frame = await outbox.get()
+                writer.write(FRAME_HEADER.pack(len(frame)) + frame)
+                await writer.drain()
+        except ConnectionError:
+            pass
+
+
+class OrderBusClient:
+    # A terminal's connection to the broker. publish() is safe to call from
+    # any thread and never blocks: events go into a bounded outbox that the
+    # sender drains in batches, and BusFull is raised once the outbox is full
+    # because the broker has stopped keeping up or is unreachable. A lost
+    # connection is retried with backoff; a batch that failed to send goes
+    # back to the front of the outbox, so delivery is at least once.
+    def __init__(
+        self,
+        host,
+        port,
+        on_events=None,
+        batch_size=64,
+        linger=0.002,
+        queue_size=1024,
+        reconnect_delay=0.1,
+        max_reconnect_delay=5.0,
+    ):
+        self.host = host
+        self.port = port
+        self.on_events = on_events
+        self.batch_size = batch_size
+        self.linger = linger
+        self.queue_size = queue_size
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.outbox = collections.deque()
+        self.loop = None
+        self.reader = None
+        self.writer = None
+        self.task = None
+        self.connected = False
+        self.sending = False
+        self.connections = 0
+        self.disconnects = 0
+        self.last_error = None
+        self.sent_events = 0
+        self.sent_batches = 0
+        self.received_events = 0
+
+    async def connect(self, wait=True):
+        # With wait the first connection must succeed (OSError otherwise);
+        # without it the client starts disconnected and keeps retrying.
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        streams = await asyncio.open_connection(self.host, self.port) if wait else None
+        self.task = asyncio.create_task(self._maintain(streams))
+        return self
+
+    def publish(self, event):
+        if len(self.outbox) >= self.queue_size:
+            raise BusFull(f"{len(self.outbox)} order events waiting to be sent")
+        self.outbox.append(event)
+        self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    async def flush(self, timeout=None):
+        # True once everything published so far has been written.
+        deadline = None if timeout is None else self.loop.time() + timeout
+        while self.outbox or self.sending:
+            if deadline is not None and self.loop.time() >= deadline:
+                return False
+            await asyncio.sleep(0.001)
+        return True
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def _maintain(self, streams):
+        delay = self.reconnect_delay
+        while True:
+            if streams is None:
+                try:
+                    streams = await asyncio.open_connection(self.host, self.port)
+                except OSError as exc:
+                    if self.connections == 0 and self.last_error is None:
+                        logger.warning(
+                            "order bus at %s:%s unreachable, retrying in the background",
+                            self.host,
+                            self.port,
+                        )
+                    self.last_error = exc
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.max_reconnect_delay)
+                    continue
+            delay = self.reconnect_delay
+            self.reader, self.writer = streams
+            streams = None
+            self.connected = True
+            self.connections += 1
+            tasks = [
+                asyncio.create_task(self._send_loop()),
+                asyncio.create_task(self._receive_loop()),
+            ]
+            try:
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                self.connected = False
+                self.sending = False
+                self.writer.close()
+            self.disconnects += 1
+            if not tasks[0].cancelled() and tasks[0].exception() is not None:
+                self.last_error = tasks[0].exception()
+            logger.warning(
+                "order bus connection to %s:%s lost, reconnecting", self.host, self.port
+            )
+
+    async def _send_loop(self):
+        while True:
+            if not self.outbox:
+                self.sending = False
+                await self.wakeup.wait()
+            self.wakeup.clear()
+            while self.outbox:
+                self.sending = True
+                if self.linger and len(self.outbox) < self.batch_size:
+                    await asyncio.sleep(self.linger)
+                batch = []
+                while self.outbox and len(batch) < self.batch_size:
+                    batch.append(self.outbox.popleft())
+                try:
+                    self.writer.write(encode_batch(batch))
+                    await self.writer.drain()
+                except BaseException:
+                    self.outbox.extendleft(reversed(batch))
+                    raise
+                self.sent_events += len(batch)
+                self.sent_batches += 1
+
+    async def _receive_loop(self):
+        try:
+            while True:
+                events = decode_batch(await read_frame(self.reader))
+                self.received_events += len(events)
+                if self.on_events is not None:
+                    self.on_events(events)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError) as exc:
+            self.last_error = exc
+
+
+class OrderBusThread:
+    # Hosts an OrderBusClient on its own event loop so the Kivy thread only
+    # makes non-blocking hand-offs: publish() to send, drain() once a frame
+    # to pick up a bounded number of received events. Starting never fails;
+    # with the broker down the terminal runs on its own and joins once the
+    # broker is reachable.
+    def __init__(self, host, port, **client_options):
+        self.inbox = collections.deque()
+        self.client = OrderBusClient(
+            host, port, on_events=self.inbox.extend, **client_options
+        )
+        self.loop = None
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="order-bus", daemon=True)
+
+    def start(self, timeout=5.0):
+        self.thread.start()
+        self.ready.wait(timeout)
+        return self
+
+    @property
+    def connected(self):
+        return self.client.connected
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.client.connect(wait=False))
+        self.ready.set()
+        self.loop.run_forever()
+
+    def publish(self, event):
+        self.client.publish(event)
+
+    def drain(self, limit=200):
+        events = []
+        while self.inbox and len(events) < limit:
+            events.append(self.inbox.popleft())
+        return events
+
+    def stop(self):
+        if self.loop is None or not self.loop.is_running():
+            return
+        future = asyncio.run_coroutine_threadsafe(self.client.close(), self.loop)
+        future.result(timeout=1.0)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=1.0)
+
+
+class BusPublisher(OrderListener):
+    def __init__(self, bus):
+        self.bus = bus
+        self.dropped_events = 0
+
+    def publish(self, kind, order):
+        self.send(OrderEvent.from_order(kind, order))
+
+    def send(self, event):
+        try:
+            self.bus.publish(event)
+        except BusFull:
+            self.dropped_events += 1
+            logger.warning("order bus is full, dropped event for %s", event.order_id)
+
+    def station_done(self, order_id, station):
+        self.send(OrderEvent.station_done(order_id, station))
+
+    def order_confirmed(self, order):
+        self.publish(ORDER_CREATED, order)
+
+    def order_completed(self, order):
+        self.publish(ORDER_COMPLETED, order)
+
+
+def parse_address(address, default_port=8765):
+    host, _, port = address.rpartition(":")
+    if not host:
+        return address, default_port
+    return host, int(port)
+
+
+async def serve(host, port):
+    broker = await OrderBroker(host, port).start()
+    print(f"order bus broker listening on {broker.host}:{broker.port}")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local order bus broker")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,460 @@
+import itertools
+import sys
+import time
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+
+class InternTable:
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def intern(self, name):
+        name_id = self.ids.get(name)
+        if name_id is None:
+            name_id = len(self.names)
+            self.ids[name] = name_id
+            self.names.append(sys.intern(name))
+        return name_id
+
+
+INGREDIENTS = InternTable()
+OPTIONS = InternTable()
+
+
+def options_mask(options):
+    mask = 0
+    for option in options:
+        mask |= 1 << OPTIONS.intern(option)
+    return mask
+
+
+def mask_bits(mask):
+    while mask:
+        low_bit = mask & -mask
+        yield low_bit.bit_length() - 1
+        mask ^= low_bit
+
+
+class MenuItem:
+    __slots__ = ("item_id", "name", "price_cents", "ingredient_ids", "ingredients", "positions")
+
+    _next_id = itertools.count(1)
+
+    def __init__(self, name, price, ingredients):
+        self.item_id = next(MenuItem._next_id)
+        self.name = name
+        # Money is integer cents everywhere; the float price is display only.
+        self.price_cents = round(price * 100)
+        # Precomputed render data: the ordered base ingredients and the bit
+        # position of each one in a line's added/removed masks.
+        self.ingredients = tuple(sorted(ingredients))
+        self.ingredient_ids = tuple(
+            INGREDIENTS.intern(ingredient) for ingredient in self.ingredients
+        )
+        self.positions = {
+            ingredient: position for position, ingredient in enumerate(self.ingredients)
+        }
+
+    @property
+    def price(self):
+        return self.price_cents / 100
+
+    def ingredient_mask(self, ingredients):
+        # Masks are over the item's own ingredient positions, so they stay a
+        # few bits wide no matter how many ingredients the whole menu knows.
+        mask = 0
+        for ingredient in ingredients:
+            position = self.positions.get(ingredient)
+            if position is not None:
+                mask |= 1 << position
+        return mask
+
+    def clone(self):
+        return Burger(self)
+
+
+class Burger:
+    # One order line: a menu item plus its modifications, frozen at creation so
+    # the canonical key and its hash are only computed once.
+    __slots__ = ("item", "added_mask", "removed_mask", "options_mask", "key", "_hash")
+
+    def __init__(self, item, added_mask=0, removed_mask=0, options_mask=0):
+        self.item = item
+        self.added_mask = added_mask
+        self.removed_mask = removed_mask
+        self.options_mask = options_mask
+        self.key = (item.item_id, added_mask, removed_mask, options_mask)
+        self._hash = hash(self.key)
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if not isinstance(other, Burger):
+            return NotImplemented
+        return self.key == other.key
+
+    def __repr__(self):
+        return f"Burger({self.key!r})"
+
+    @property
+    def name(self):
+        return self.item.name
+
+    @property
+    def price(self):
+        return self.item.price
+
+    @property
+    def price_cents(self):
+        return self.item.price_cents
+
+    @property
+    def ingredients(self):
+        return list(self.item.ingredients)
+
+    @property
+    def added_ingredients(self):
+        return self._ingredient_names(self.added_mask)
+
+    @property
+    def removed_ingredients(self):
+        return self._ingredient_names(self.removed_mask)
+
+    @property
+    def additional_options(self):
+        return [OPTIONS.names[option_id] for option_id in mask_bits(self.options_mask)]
+
+    def _ingredient_names(self, mask):
+        ingredients = self.item.ingredients
+        return [ingredients[position] for position in mask_bits(mask)]
+
+    def clone(self):
+        return Burger(self.item)
+
+    def modified(self, added=(), removed=(), options=()):
+        return Burger(
+            self.item,
+            added_mask=self.added_mask | self.item.ingredient_mask(added),
+            removed_mask=self.removed_mask | self.item.ingredient_mask(removed),
+            options_mask=self.options_mask | options_mask(options),
+        )
+
+    def to_record(self):
+        # Portable form for the order bus and journal. Ingredient masks are
+        # positional over the item's sorted ingredients, which every terminal
+        # sharing the menu agrees on; option ids are per process, so options
+        # travel by name.
+        return [self.item.name, self.added_mask, self.removed_mask, self.additional_options]
+
+    def display_ingredients(self):
+        ingredients_display = []
+        removed_ingredients = self.removed_ingredients
+        for ingredient in self.ingredients:
+            if ingredient in removed_ingredients:
+                ingredients_display.append(f"NO {ingredient}")
+            else:
+                ingredients_display.append(ingredient)
+        for ingredient in self.added_ingredients:
+            ingredients_display.append(f"ADD {ingredient}")
+        return ", ".join(ingredients_display)
+
+    def display_modifications(self):
+        return self.added_ingredients, self.removed_ingredients
+
+
+@dataclass
+class Menu:
+    burgers: list[MenuItem] = field(default_factory=list)
+    version: int = 0
+    options: list[str] = field(default_factory=list)
+    by_name: dict = field(default_factory=dict, repr=False)
+    by_id: dict = field(default_factory=dict, repr=False)
+    repriced: dict = field(default_factory=dict, repr=False)
+
+    def __post_init__(self):
+        for burger in self.burgers:
+            self.by_name[burger.name] = burger
+            self.by_id[burger.item_id] = burger
+
+    def add_burger(self, burger: MenuItem):
+        if burger.name in self.by_name:
+            self.remove_burger(burger.name)
+        self.burgers.append(burger)
+        self.by_name[burger.name] = burger
+        self.by_id[burger.item_id] = burger
+        self.version += 1
+
+    def remove_burger(self, burger_name: str):
+        burger = self.by_name.pop(burger_name, None)
+        if burger is None:
+            return
+        del self.by_id[burger.item_id]
+        self.burgers.remove(burger)
+        self.version += 1
+
+    def find_burger(self, burger_name: str):
+        return self.by_name.get(burger_name)
+
+    def find_item(self, item_id: int):
+        return self.by_id.get(item_id)
+
+    def line_from_record(self, record, price_cents=None):
+        name, added_mask, removed_mask, options = record
+        item = self.by_name.get(name)
+        if item is None:
+            raise KeyError(f"{name} is not on the menu")
+        if price_cents is not None and price_cents != item.price_cents:
+            # A line priced before the menu changed keeps its price, on an
+            # off-menu copy of the item.
+            key = (name, price_cents)
+            repriced = self.repriced.get(key)
+            if repriced is None or repriced.ingredients != item.ingredients:
+                repriced = self.repriced[key] = MenuItem(
+                    name, price_cents / 100, item.ingredients
+                )
+            item = repriced
+        return Burger(
+            item,
+            added_mask=added_mask,
+            removed_mask=removed_mask,
+            options_mask=options_mask(options),
+        )
+
+    def display_menu(self):
+        pass
+        # for burger in self.burgers
+
+
+class OrderState:
+    OPEN = "open"
+    COMPLETED = "completed"
+    ARCHIVED = "archived"
+
+
+@dataclass(frozen=True)
+class ArchivedOrder:
+    order_id: str
+    customer_name: str
+    total_cents: int
+    item_count: int
+    completed_at: float
+    state: str = OrderState.ARCHIVED
+
+
+class OrderRegistry:
+    # Open orders live until completed, completed orders are kept whole until
+    # they pass the limit or age, then shrink to an ArchivedOrder. The archive
+    # itself is bounded so a long shift can't grow the registry without end.
+    def __init__(self, completed_limit=50, completed_max_age=30 * 60, archive_limit=2000):
+        self.completed_limit = completed_limit
+        self.completed_max_age = completed_max_age
+        self.archive_limit = archive_limit
+        self.open_orders = {}
+        self.completed_orders = OrderedDict()
+        self.archived_orders = OrderedDict()
+
+    def __len__(self):
+        return (
+            len(self.open_orders)
+            + len(self.completed_orders)
+            + len(self.archived_orders)
+        )
+
+    def __contains__(self, order_id):
+        return self.get(order_id) is not None
+
+    def get(self, order_id):
+        order = self.open_orders.get(order_id)
+        if order is None:
+            order = self.completed_orders.get(order_id)
+        if order is None:
+            order = self.archived_orders.get(order_id)
+        return order
+
+    def get_live(self, order_id):
+        order = self.open_orders.get(order_id)
+        if order is None:
+            order = self.completed_orders.get(order_id)
+        return order
+
+    def state(self, order_id):
+        order = self.get(order_id)
+        return order.state if order is not None else None
+
+    def register(self, order):
+        order.state = OrderState.OPEN
+        self.open_orders[order.order_id] = order
+        # Ageing out completed orders can't wait for the next completion;
+        # a quiet rail may not see one for a long time.
+        self.evict()
+
+    def complete(self, order_id, now=None):
+        order = self.open_orders.pop(order_id, None)
+        if order is None:
+            return self.get(order_id)
+        order.state = OrderState.COMPLETED
+        order.completed_at = time.time() if now is None else now
+        self.completed_orders[order_id] = order
+        self.evict(now=order.completed_at)
+        return order
+
+    def discard(self, order_id):
+        self.open_orders.pop(order_id, None)
+        self.completed_orders.pop(order_id, None)
+        self.archived_orders.pop(order_id, None)
+
+    def evict(self, now=None):
+        now = time.time() if now is None else now
+        while self.completed_orders:
+            order_id, order = next(iter(self.completed_orders.items()))
+            too_many = len(self.completed_orders) > self.completed_limit
+            too_old = now - order.completed_at > self.completed_max_age
+            if not (too_many or too_old):
+                break
+            del self.completed_orders[order_id]
+            self.archived_orders[order_id] = self.archive(order)
+        while len(self.archived_orders) > self.archive_limit:
+            self.archived_orders.popitem(last=False)
+
+    def archive(self, order):
+        return ArchivedOrder(
+            order_id=order.order_id,
+            customer_name=order.customer_name,
+            total_cents=order.subtotal_cents,
+            item_count=order.item_count,
+            completed_at=order.completed_at,
+        )
+
+    def clear(self):
+        self.open_orders.clear()
+        self.completed_orders.clear()
+        self.archived_orders.clear()
+
+
+class Order:
+    order_id: str
+    customer_name: str
+    registry = OrderRegistry()
+
+    def __new__(cls, order_id):
+        existing_order = cls.registry.get_live(order_id)
+        if existing_order is not None:
+            return existing_order
+
+        instance = super(Order, cls).__new__(cls)
+        instance.order_id = order_id
+        cls.registry.register(instance)
+        return instance
+
+    def __init__(self, order_id):
+        if not hasattr(self, "initialized"):
+            self.order_id = order_id
+            self.customer_name = None
+            self.confirmed_at = None
+            self.completed_at = None
+            # Live line-item table: identical burgers share one key, in the
+            # order they were first added, mapped to their quantity.
+            self.lines = {}
+            self.item_count = 0
+            self.subtotal_cents = 0
+            self.version = 0
+            self.initialized = True
+
+    @property
+    def burgers(self):
+        return [burger for burger, count in self.lines.items() for _ in range(count)]
+
+    def count_identical_burgers(self):
+        return dict(self.lines)
+
+    def add_burger(self, burger, quantity=1):
+        if quantity < 1:
+            raise ValueError(f"cannot add {quantity} of {burger.name}")
+        self.lines[burger] = self.lines.get(burger, 0) + quantity
+        self.item_count += quantity
+        self.version += 1
+        self.subtotal_cents += burger.price_cents * quantity
+
+    def set_quantity(self, burger, quantity):
+        # Edits a line in place (keeping its position); 0 removes it.
+        if quantity < 0:
+            raise ValueError(f"cannot set {burger.name} to {quantity}")
+        delta = quantity - self.lines.get(burger, 0)
+        if quantity:
+            self.lines[burger] = quantity
+        else:
+            self.lines.pop(burger, None)
+        self.item_count += delta
+        self.version += 1
+        self.subtotal_cents += burger.price_cents * delta
+
+    def remove_burger(self, burger):
+        count = self.lines.get(burger)
+        if count is None:
+            raise ValueError(f"{burger.name} is not in order {self.order_id}")
+        if count == 1:
+            del self.lines[burger]
+        else:
+            self.lines[burger] = count - 1
+        self.item_count -= 1
+        self.version += 1
+        self.subtotal_cents -= burger.price_cents
+
+    def clear(self):
+        self.lines.clear()
+        self.item_count = 0
+        self.subtotal_cents = 0
+        self.version += 1
+
+    def total_price(self):
+        return self.subtotal_cents / 100
+
+    def order_details(self):
+        detail = ""
+        for burger, count in self.lines.items():
+            detail += f"{burger.name}: {burger.display_ingredients()}\n" * count
+        return detail
+
+
+DEFAULT_MENU = [
+    (
+        "The Revolt (Single)",
+        12.00,
+        ["Two Patties", "Rebel Sauce", "One Cheese", "Arugula", "Roma Tomato"],
+    ),
+    (
+        "The Revolt (Double)",
+        14.00,
+        ["Two Patties", "Rebel Sauce", "Two Cheese", "Arugula", "Roma Tomato"],
+    ),
+    (
+        "The Hexxor",
+        14.00,
+        [
+            "Two Patties",
+            "Avocado Bacon Sauce",
+            "Cheese",
+            "Arugula",
+            "Red Onion",
+        ],
+    ),
+    ("The Sham-moo", 14.00, ["Vegan Patty", "Tomato Pesto", "Arugula"]),
+    ("Hot Texan", 5.00, ["Hot dog", "Chili Sauce", "Mustard", "Onion"]),
+]
+
+DEFAULT_OPTIONS = ["Gluten Free Bun", "Vegan", "Plain"]
+
+
+def populate_menu(burgers_data=DEFAULT_MENU, options=DEFAULT_OPTIONS):
+    menu = Menu(options=list(options))
+    for name, price, ingredients in burgers_data:
+        menu.add_burger(MenuItem(name, price, ingredients))
+    return menu
+
+
+def get_default_options():
+    return list(DEFAULT_OPTIONS)
@@ -0,0 +1,109 @@
+import time
+import uuid
+
+from .core import Order
+
+
+class OrderListener:
+    # Engine listeners override whichever of these they care about.
+    def order_item_added(self, order, burger, quantity=1):
+        pass
+
+    def order_line_changed(self, order, burger, quantity):
+        pass
+
+    def order_confirmed(self, order):
+        pass
+
+    def order_completed(self, order):
+        pass
+
+    def order_discarded(self, order):
+        pass
+
+    # Orders confirmed or completed on another terminal. Whatever mirrors the
+    # rail to the network leaves these alone; persistence still wants them.
+    def order_received(self, order):
+        pass
+
+    def order_completed_elsewhere(self, order):
+        pass
+
+
+class OrderEngine:
+    # The order flow behind the counter screen: build the current order,
+    # confirm it onto the rail, complete it from the rail.
+    def __init__(self):
+        self.current_order = None
+        self.existing_orders = {}
+        self.listeners = []
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def add_item_to_order(self, burger, quantity=1):
+        if self.current_order is None:
+            self.current_order = Order(order_id=str(uuid.uuid4()))
+        self.current_order.add_burger(burger, quantity)
+        for listener in self.listeners:
+            listener.order_item_added(self.current_order, burger, quantity)
+        return self.current_order
+
+    def set_quantity(self, burger, quantity):
+        # Edits a line of the order being built; quantity is the new total.
+        order = self.current_order
+        if order is None:
+            return None
+        order.set_quantity(burger, quantity)
+        for listener in self.listeners:
+            listener.order_line_changed(order, burger, quantity)
+        return order
+
+    def confirm_order(self, customer_name=None):
+        order = self.current_order
+        if order is None:
+            return None
+        if not order.lines:
+            # Every line was set to zero; nothing goes to the rail.
+            self.discard_current_order()
+            return None
+        self.current_order = None
+        order.confirmed_at = time.time()
+        if customer_name:
+            order.customer_name = customer_name
+        self.existing_orders[order.order_id] = order
+        for listener in self.listeners:
+            listener.order_confirmed(order)
+        return order
+
+    def discard_current_order(self):
+        order = self.current_order
+        if order is None:
+            return
+        self.current_order = None
+        Order.registry.discard(order.order_id)
+        for listener in self.listeners:
+            listener.order_discarded(order)
+
+    def receive_order(self, order):
+        # An order confirmed elsewhere (another terminal, a recovered
+        # journal); listeners hear order_received rather than order_confirmed
+        # so it isn't published again.
+        self.existing_orders[order.order_id] = order
+        for listener in self.listeners:
+            listener.order_received(order)
+        return order
+
+    def order_complete(self, order_id, notify=True):
+        order = self.existing_orders.pop(order_id, None)
+        if order is not None:
+            Order.registry.complete(order_id)
+            for listener in self.listeners:
+                if notify:
+                    listener.order_completed(order)
+                else:
+                    listener.order_completed_elsewhere(order)
+        return order
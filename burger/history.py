@@ -0,0 +1,208 @@
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+from dataclasses import dataclass
+
+from .engine import OrderListener
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    customer_name TEXT,
+    customer_key TEXT,
+    confirmed_at REAL,
+    completed_at REAL NOT NULL,
+    subtotal_cents INTEGER NOT NULL,
+    item_count INTEGER NOT NULL,
+    lines TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS orders_by_customer ON orders (customer_key, completed_at);
+CREATE INDEX IF NOT EXISTS orders_by_completed ON orders (completed_at);
+"""
+
+# Databases from before money was kept in cents have a REAL total column.
+MIGRATE_TOTAL_TO_CENTS = f"""
+BEGIN;
+DROP INDEX IF EXISTS orders_by_customer;
+DROP INDEX IF EXISTS orders_by_completed;
+ALTER TABLE orders RENAME TO orders_before_cents;
+{SCHEMA}
+INSERT INTO orders
+    SELECT order_id, customer_name, customer_key, confirmed_at, completed_at,
+           CAST(ROUND(total * 100) AS INTEGER), item_count, lines
+    FROM orders_before_cents;
+DROP TABLE orders_before_cents;
+COMMIT;
+"""
+
+COLUMNS = (
+    "order_id, customer_name, confirmed_at, completed_at, subtotal_cents, item_count, lines"
+)
+
+
+def customer_key(customer_name):
+    return customer_name.strip().casefold() if customer_name else None
+
+
+@dataclass(frozen=True)
+class HistoryEntry:
+    order_id: str
+    customer_name: str
+    confirmed_at: float
+    completed_at: float
+    subtotal_cents: int
+    item_count: int
+    lines: list
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row[:6], json.loads(row[6]))
+
+
+class OrderHistory(OrderListener):
+    # Completed orders in SQLite (WAL). order_completed only queues a row; a
+    # writer thread inserts whatever has queued up in one transaction. Reads
+    # use a connection per calling thread and hit the order id, customer and
+    # completion time indexes, so nothing is loaded beyond the result.
+    def __init__(self, path, flush_interval=0.5):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.pending = queue.Queue()
+        self.readers = threading.local()
+        self.reader_connections = []
+        self.reader_lock = threading.Lock()
+        self.thread = None
+
+    def open(self):
+        connection = self.connect()
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(orders)")}
+        connection.executescript(
+            MIGRATE_TOTAL_TO_CENTS if "total" in columns else SCHEMA
+        )
+        connection.close()
+        self.thread = threading.Thread(
+            target=self._write_loop, name="order-history", daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def connect(self, check_same_thread=True):
+        connection = sqlite3.connect(self.path, check_same_thread=check_same_thread)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def close(self):
+        if self.thread is not None:
+            self.pending.put(None)
+            self.thread.join()
+            self.thread = None
+        # Reader connections belong to their threads but are closed here,
+        # hence check_same_thread=False when they are made.
+        with self.reader_lock:
+            for connection in self.reader_connections:
+                connection.close()
+            self.reader_connections.clear()
+        self.readers = threading.local()
+
+    def flush(self):
+        self.pending.join()
+
+    def order_completed(self, order):
+        self.pending.put(
+            (
+                order.order_id,
+                order.customer_name,
+                customer_key(order.customer_name),
+                order.confirmed_at,
+                order.completed_at or time.time(),
+                order.subtotal_cents,
+                order.item_count,
+                json.dumps(
+                    [
+                        burger.to_record() + [count, burger.price_cents]
+                        for burger, count in order.lines.items()
+                    ],
+                    separators=(",", ":"),
+                ),
+            )
+        )
+
+    def _write_loop(self):
+        connection = self.connect()
+        running = True
+        while running:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.pending.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            rows = [row for row in batch if row is not None]
+            running = len(rows) == len(batch)
+            try:
+                with connection:
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO orders VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+            except sqlite3.Error:
+                logger.exception("could not write %d orders to %s", len(rows), self.path)
+            for _ in batch:
+                self.pending.task_done()
+        connection.close()
+
+    def _reader(self):
+        connection = getattr(self.readers, "connection", None)
+        if connection is None:
+            connection = self.readers.connection = self.connect(check_same_thread=False)
+            with self.reader_lock:
+                self.reader_connections.append(connection)
+        return connection
+
+    def get(self, order_id):
+        row = self._reader().execute(
+            f"SELECT {COLUMNS} FROM orders WHERE order_id = ?", (order_id,)
+        ).fetchone()
+        return HistoryEntry.from_row(row) if row is not None else None
+
+    def find(self, customer=None, since=None, until=None, limit=50):
+        # Newest first. customer is a case-insensitive name prefix.
+        clauses = []
+        params = []
+        prefix = customer_key(customer)
+        if prefix:
+            clauses.append("customer_key >= ? AND customer_key < ?")
+            params += [prefix, prefix + "\U0010ffff"]
+        if since is not None:
+            clauses.append("completed_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("completed_at <= ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._reader().execute(
+            f"SELECT {COLUMNS} FROM orders {where} ORDER BY completed_at DESC LIMIT ?",
+            params + [limit],
+        ).fetchall()
+        return [HistoryEntry.from_row(row) for row in rows]
+
+    def completed_after(self, since=None):
+        # Oldest first and unlimited, for stores that follow the history.
+        where = "" if since is None else "WHERE completed_at > ?"
+        rows = self._reader().execute(
+            f"SELECT {COLUMNS} FROM orders {where} ORDER BY completed_at",
+            () if since is None else (since,),
+        )
+        for row in rows:
+            yield HistoryEntry.from_row(row)
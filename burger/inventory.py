@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+
+from .core import INGREDIENTS, mask_bits
+from .engine import OrderListener
+
+logger = logging.getLogger(__name__)
+
+
+class Inventory(OrderListener):
+    # Portions on hand per ingredient. A menu item consumes one portion of
+    # each base ingredient (its ingredient_ids are the consumption vector),
+    # an EXTRA one more and a NONE one less, so confirming a line touches
+    # only that item's ingredients. Ingredients without a stock level are
+    # not tracked and never run out.
+    def __init__(self, menu=None):
+        self.stock = {}
+        self.thresholds = {}
+        self.low = set()
+        # ingredient id -> ids of the menu items that use it, and per item
+        # the number of its ingredients currently at or below threshold.
+        self.users = {}
+        self.low_counts = {}
+        # Called with (item_ids, available) when items cross in or out of low.
+        self.listeners = []
+        # Stock moved since the last save.
+        self.dirty = False
+        if menu is not None:
+            self.set_menu(menu)
+
+    def set_menu(self, menu):
+        users = {}
+        for item in menu.burgers:
+            for ingredient_id in item.ingredient_ids:
+                users.setdefault(ingredient_id, []).append(item.item_id)
+        self.users = users
+        self.low_counts = {}
+        for ingredient_id in self.low:
+            for item_id in users.get(ingredient_id, ()):
+                self.low_counts[item_id] = self.low_counts.get(item_id, 0) + 1
+
+    def is_available(self, item):
+        return not self.low_counts.get(item.item_id)
+
+    def level(self, ingredient):
+        return self.stock.get(INGREDIENTS.intern(ingredient))
+
+    def set_stock(self, ingredient, units, threshold=None):
+        ingredient_id = INGREDIENTS.intern(ingredient)
+        if threshold is not None:
+            self.thresholds[ingredient_id] = threshold
+        self.stock[ingredient_id] = units
+        self.adjust(ingredient_id, 0)
+
+    def restock(self, ingredient, units):
+        ingredient_id = INGREDIENTS.intern(ingredient)
+        if ingredient_id in self.stock:
+            self.adjust(ingredient_id, units)
+
+    def untrack(self, ingredient):
+        ingredient_id = INGREDIENTS.intern(ingredient)
+        if ingredient_id in self.low:
+            self.mark_low(ingredient_id, False)
+        self.stock.pop(ingredient_id, None)
+        self.thresholds.pop(ingredient_id, None)
+        self.dirty = True
+
+    def order_confirmed(self, order):
+        for burger, count in order.lines.items():
+            self.consume(burger, count)
+
+    def consume(self, burger, count=1):
+        ingredient_ids = burger.item.ingredient_ids
+        for ingredient_id in ingredient_ids:
+            self.adjust(ingredient_id, -count)
+        for position in mask_bits(burger.added_mask):
+            self.adjust(ingredient_ids[position], -count)
+        for position in mask_bits(burger.removed_mask):
+            self.adjust(ingredient_ids[position], count)
+
+    def adjust(self, ingredient_id, delta):
+        units = self.stock.get(ingredient_id)
+        if units is None:
+            return
+        units += delta
+        self.stock[ingredient_id] = units
+        self.dirty = True
+        is_low = units <= self.thresholds.get(ingredient_id, 0)
+        if is_low != (ingredient_id in self.low):
+            self.mark_low(ingredient_id, is_low)
+
+    def mark_low(self, ingredient_id, is_low):
+        step = 1 if is_low else -1
+        if is_low:
+            self.low.add(ingredient_id)
+        else:
+            self.low.discard(ingredient_id)
+        changed = []
+        for item_id in self.users.get(ingredient_id, ()):
+            count = self.low_counts.get(item_id, 0) + step
+            self.low_counts[item_id] = count
+            # Only items that cross between zero and one low ingredient change.
+            if count == (1 if is_low else 0):
+                changed.append(item_id)
+        if changed:
+            for listener in self.listeners:
+                listener(changed, not is_low)
+
+    def to_dict(self):
+        return {
+            INGREDIENTS.names[ingredient_id]: {
+                "stock": units,
+                "low": self.thresholds.get(ingredient_id, 0),
+            }
+            for ingredient_id, units in self.stock.items()
+        }
+
+    def save(self, path):
+        # Written aside and swapped in, so a crash mid-save leaves the last
+        # good file.
+        temporary = path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as output:
+            json.dump(self.to_dict(), output, indent=2)
+            output.flush()
+            os.fsync(output.fileno())
+        os.replace(temporary, path)
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path, menu=None):
+        # {"Arugula": {"stock": 40, "low": 5}, ...}; a missing or unreadable
+        # file tracks nothing.
+        inventory = cls(menu)
+        try:
+            with open(path, encoding="utf-8") as source:
+                levels = [
+                    (ingredient, level["stock"], level.get("low", 0))
+                    for ingredient, level in json.load(source).items()
+                ]
+        except FileNotFoundError:
+            return inventory
+        except Exception:
+            logger.exception("could not read inventory from %s, tracking nothing", path)
+            return inventory
+        for ingredient, units, threshold in levels:
+            inventory.set_stock(ingredient, units, threshold)
+        inventory.dirty = False
+        return inventory
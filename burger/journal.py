@@ -0,0 +1,293 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from .core import Order
+from .engine import OrderListener
+
+logger = logging.getLogger(__name__)
+
+ADD = "add"
+SET = "set"
+CONFIRM = "confirm"
+COMPLETE = "complete"
+DISCARD = "discard"
+
+
+def encode_line(burger, count):
+    # The price goes with the line so a recovered order keeps what it was
+    # rung up at, even if the menu price has changed since.
+    return burger.to_record() + [count, burger.price_cents]
+
+
+def encode_lines(order):
+    return [encode_line(burger, count) for burger, count in order.lines.items()]
+
+
+class _Snapshot:
+    __slots__ = ("seq", "state")
+
+    def __init__(self, seq, state):
+        self.seq = seq
+        self.state = state
+
+
+class OrderJournal(OrderListener):
+    # Append-only record of every add / confirm / complete. Listener callbacks
+    # only number the record and queue it; a writer thread appends whatever
+    # has queued up and fsyncs once per batch. Every snapshot_every records
+    # the open orders are snapshotted and the journal restarts, so recovery
+    # reads one snapshot plus a short tail.
+    def __init__(self, directory, flush_interval=0.05, snapshot_every=1000):
+        self.directory = directory
+        self.journal_path = os.path.join(directory, "orders.journal")
+        self.snapshot_path = os.path.join(directory, "orders.snapshot")
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        self.engine = None
+        self.seq = 0
+        self.records_since_snapshot = 0
+        self.pending = queue.Queue()
+        self.thread = None
+        self.file = None
+
+    def open(self, engine):
+        os.makedirs(self.directory, exist_ok=True)
+        self.engine = engine
+        self.file = open(self.journal_path, "a", encoding="utf-8")
+        self.thread = threading.Thread(
+            target=self._write_loop, name="order-journal", daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def flush(self):
+        # Block until everything queued so far is on disk.
+        self.pending.join()
+
+    def close(self):
+        if self.thread is None:
+            return
+        self.snapshot()
+        self.pending.put(None)
+        self.thread.join()
+        self.thread = None
+        self.file.close()
+
+    def append(self, kind, order_id, payload=None):
+        self.seq += 1
+        self.pending.put(
+            json.dumps([self.seq, kind, order_id, payload], separators=(",", ":"))
+        )
+        self.records_since_snapshot += 1
+        if self.records_since_snapshot >= self.snapshot_every:
+            self.snapshot()
+
+    def snapshot(self):
+        engine = self.engine
+        current = engine.current_order
+        state = {
+            "seq": self.seq,
+            "current": (
+                [current.order_id, current.customer_name, encode_lines(current)]
+                if current is not None
+                else None
+            ),
+            "open": [
+                [
+                    order.order_id,
+                    order.customer_name,
+                    encode_lines(order),
+                    order.confirmed_at,
+                ]
+                for order in engine.existing_orders.values()
+            ],
+        }
+        self.records_since_snapshot = 0
+        self.pending.put(_Snapshot(self.seq, state))
+
+    def order_item_added(self, order, burger, quantity=1):
+        self.append(ADD, order.order_id, encode_line(burger, quantity))
+
+    def order_line_changed(self, order, burger, quantity):
+        self.append(SET, order.order_id, encode_line(burger, quantity))
+
+    def order_confirmed(self, order):
+        self.append(CONFIRM, order.order_id, [order.customer_name, order.confirmed_at])
+
+    def order_completed(self, order):
+        self.append(COMPLETE, order.order_id)
+
+    def order_discarded(self, order):
+        self.append(DISCARD, order.order_id)
+
+    def order_received(self, order):
+        # Nothing of a received order went through ADD, so its CONFIRM
+        # carries the lines too.
+        self.append(
+            CONFIRM,
+            order.order_id,
+            [order.customer_name, order.confirmed_at, encode_lines(order)],
+        )
+
+    def order_completed_elsewhere(self, order):
+        self.append(COMPLETE, order.order_id)
+
+    def _write_loop(self):
+        running = True
+        while running:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.pending.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            lines = []
+            for entry in batch:
+                if entry is None:
+                    running = False
+                elif isinstance(entry, _Snapshot):
+                    self._write_lines(lines)
+                    lines = []
+                    self._write_snapshot(entry)
+                else:
+                    lines.append(entry)
+            self._write_lines(lines)
+            for _ in batch:
+                self.pending.task_done()
+
+    def _write_lines(self, lines):
+        if not lines:
+            return
+        self.file.write("\n".join(lines) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def _write_snapshot(self, snapshot):
+        temporary_path = self.snapshot_path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as snapshot_file:
+            json.dump(snapshot.state, snapshot_file, separators=(",", ":"))
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temporary_path, self.snapshot_path)
+        # Everything in the journal so far is covered by the snapshot. If we
+        # crash before the truncate, replay skips those records by seq.
+        self.file.close()
+        self.file = open(self.journal_path, "w", encoding="utf-8")
+        os.fsync(self.file.fileno())
+
+    def recover(self, engine, menu):
+        # Rebuild the open tickets and the in-progress order from the last
+        # snapshot plus the journal tail. Call before open().
+        last_seq = 0
+        orders = {}
+        confirmed = set()
+        current_id = None
+
+        def take(order_id, customer_name, lines, replace=False):
+            order_lines = orders.setdefault(order_id, [customer_name, {}, None])[1]
+            for line in lines:
+                # Older journals have no price (current menu price) and
+                # leave out a quantity of 1 on ADD.
+                if len(line) == 4:
+                    line = line + [1]
+                price_cents = line[5] if len(line) > 5 else None
+                key = (line[0], line[1], line[2], tuple(line[3]), price_cents)
+                count = line[4] if replace else order_lines.get(key, 0) + line[4]
+                if count:
+                    order_lines[key] = count
+                else:
+                    order_lines.pop(key, None)
+
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding="utf-8") as snapshot_file:
+                state = json.load(snapshot_file)
+            last_seq = state["seq"]
+            for entry in state["open"]:
+                order_id = entry[0]
+                take(*entry[:3])
+                # Older snapshots have no confirm time.
+                if len(entry) > 3:
+                    orders[order_id][2] = entry[3]
+                confirmed.add(order_id)
+            if state["current"] is not None:
+                current_id = state["current"][0]
+                take(*state["current"])
+
+        # A record counts once its newline is written. Anything after the
+        # last whole record is cut off before open() appends again, or the
+        # next record would be glued onto the torn one and lost with it.
+        good_offset = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "rb") as journal_file:
+                for raw in journal_file:
+                    try:
+                        if not raw.endswith(b"\n"):
+                            raise ValueError("unterminated record")
+                        seq, kind, order_id, payload = json.loads(raw)
+                    except ValueError:
+                        logger.warning(
+                            "ignoring torn record at the end of %s", self.journal_path
+                        )
+                        break
+                    good_offset += len(raw)
+                    if seq <= last_seq:
+                        continue
+                    last_seq = seq
+                    if kind == ADD or kind == SET:
+                        take(order_id, None, [payload], replace=kind == SET)
+                        if order_id not in confirmed:
+                            current_id = order_id
+                    elif kind == CONFIRM:
+                        confirmed.add(order_id)
+                        # Older journals store just the customer name.
+                        if not isinstance(payload, list):
+                            payload = [payload, None]
+                        if len(payload) > 2:
+                            orders.pop(order_id, None)
+                            take(order_id, None, payload[2])
+                        orders.setdefault(order_id, [None, {}, None])
+                        orders[order_id][0] = payload[0]
+                        orders[order_id][2] = payload[1]
+                        if current_id == order_id:
+                            current_id = None
+                    else:
+                        orders.pop(order_id, None)
+                        confirmed.discard(order_id)
+                        if current_id == order_id:
+                            current_id = None
+
+            if os.path.getsize(self.journal_path) > good_offset:
+                with open(self.journal_path, "r+b") as journal_file:
+                    journal_file.truncate(good_offset)
+                    os.fsync(journal_file.fileno())
+
+        for order_id, (customer_name, lines, confirmed_at) in orders.items():
+            if order_id not in confirmed and order_id != current_id:
+                continue
+            order = Order(order_id)
+            order.customer_name = customer_name
+            if confirmed_at is not None:
+                order.confirmed_at = confirmed_at
+            for (name, added_mask, removed_mask, options, price_cents), count in lines.items():
+                try:
+                    burger = menu.line_from_record(
+                        [name, added_mask, removed_mask, list(options)], price_cents
+                    )
+                except KeyError:
+                    logger.warning("%s is no longer on the menu, dropped from %s", name, order_id)
+                    continue
+                order.add_burger(burger, count)
+            if order_id == current_id:
+                engine.current_order = order
+            else:
+                engine.receive_order(order)
+        self.seq = last_seq
+        return engine
@@ -0,0 +1,205 @@
+import heapq
+import itertools
+import time
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Station:
+    name: str
+    # Lines go to the first station with a keyword in one of the item's
+    # ingredients; a station without keywords takes everything left over.
+    keywords: tuple
+    prep_seconds: float
+    per_unit_seconds: float
+
+    def prep_time(self, count):
+        return self.prep_seconds + self.per_unit_seconds * (count - 1)
+
+
+DEFAULT_STATIONS = (
+    Station("grill", ("patty", "patties"), 240, 30),
+    Station("fryer", ("hot dog",), 180, 20),
+    Station("cold", (), 60, 15),
+)
+
+
+class KitchenLine:
+    __slots__ = (
+        "line_id",
+        "order_id",
+        "burger",
+        "count",
+        "station",
+        "prep_seconds",
+        "confirmed_at",
+        "promised_at",
+        "start_by",
+        "done",
+    )
+
+    def __init__(self, line_id, order_id, burger, count, station, confirmed_at):
+        self.line_id = line_id
+        self.order_id = order_id
+        self.burger = burger
+        self.count = count
+        self.station = station.name
+        self.prep_seconds = station.prep_time(count)
+        self.confirmed_at = confirmed_at
+        self.promised_at = None
+        self.start_by = None
+        self.done = False
+
+    def __repr__(self):
+        return f"KitchenLine({self.order_id!r}, {self.burger.name!r} x{self.count}, {self.station})"
+
+
+class KitchenScheduler:
+    # Splits confirmed orders into per-station lines and keeps one heap per
+    # station ordered by latest start time (promised time minus prep time),
+    # then age. Adding or re-prioritising a line is a heap push; superseded,
+    # cancelled and finished entries are only skipped when they reach the
+    # top, and a heap is rebuilt once it is mostly dead entries.
+    def __init__(self, stations=DEFAULT_STATIONS, promise_slack=120):
+        self.stations = {station.name: station for station in stations}
+        self.promise_slack = promise_slack
+        self.routes = {}
+        self.queues = {name: [] for name in self.stations}
+        self.pending = {name: 0 for name in self.stations}
+        # order_id -> (order version, its lines)
+        self.order_lines = {}
+        self.line_ids = itertools.count()
+
+    def route(self, item):
+        station = self.routes.get(item.item_id)
+        if station is None:
+            ingredients = [ingredient.casefold() for ingredient in item.ingredients]
+            for candidate in self.stations.values():
+                if not candidate.keywords or any(
+                    keyword in ingredient
+                    for keyword in candidate.keywords
+                    for ingredient in ingredients
+                ):
+                    station = candidate
+                    break
+            else:
+                station = candidate
+            self.routes[item.item_id] = station
+        return station
+
+    def update(self, order, now=None):
+        scheduled = self.order_lines.get(order.order_id)
+        if scheduled is not None:
+            if scheduled[0] == order.version:
+                return scheduled[1]
+            self.remove(order.order_id)
+        confirmed_at = order.confirmed_at or now or time.time()
+        lines = [
+            KitchenLine(
+                next(self.line_ids),
+                order.order_id,
+                burger,
+                count,
+                self.route(burger.item),
+                confirmed_at,
+            )
+            for burger, count in order.count_identical_burgers().items()
+        ]
+        if not lines:
+            return lines
+        # Stations work in parallel, so the order is promised for when its
+        # slowest line is done, plus some slack.
+        promised_at = (
+            confirmed_at + max(line.prep_seconds for line in lines) + self.promise_slack
+        )
+        for line in lines:
+            self.push(line, promised_at)
+            self.pending[line.station] += 1
+        self.order_lines[order.order_id] = (order.version, lines)
+        return lines
+
+    @staticmethod
+    def live(entry):
+        # An entry is current while its line is pending and hasn't been
+        # pushed again under a newer id.
+        line = entry[3]
+        return not line.done and entry[2] == line.line_id
+
+    def push(self, line, promised_at):
+        line.promised_at = promised_at
+        line.start_by = promised_at - line.prep_seconds
+        queue = self.queues[line.station]
+        heapq.heappush(queue, (line.start_by, line.confirmed_at, line.line_id, line))
+        if len(queue) > 64 and len(queue) > 2 * self.pending[line.station]:
+            self.compact(line.station)
+
+    def compact(self, station):
+        queue = [entry for entry in self.queues[station] if self.live(entry)]
+        heapq.heapify(queue)
+        self.queues[station] = queue
+
+    def promise(self, order_id, promised_at):
+        # Re-prioritise an order's pending lines under a new promised time.
+        scheduled = self.order_lines.get(order_id)
+        if scheduled is None:
+            return
+        for line in scheduled[1]:
+            if not line.done:
+                line.line_id = next(self.line_ids)
+                self.push(line, promised_at)
+
+    def retire(self, line):
+        if not line.done:
+            line.done = True
+            self.pending[line.station] -= 1
+            queue = self.queues[line.station]
+            if len(queue) > 64 and len(queue) > 2 * self.pending[line.station]:
+                self.compact(line.station)
+
+    def remove(self, order_id):
+        scheduled = self.order_lines.pop(order_id, None)
+        if scheduled is not None:
+            for line in scheduled[1]:
+                self.retire(line)
+
+    def pop(self, station):
+        # Hands the most urgent line of a station to the cook.
+        queue = self.queues[station]
+        while queue:
+            entry = heapq.heappop(queue)
+            if self.live(entry):
+                line = entry[3]
+                line.done = True
+                self.pending[station] -= 1
+                return line
+        return None
+
+    def finish(self, order_id, station):
+        # Marks an order's lines at one station done; True once the order has
+        # nothing left at any station.
+        scheduled = self.order_lines.get(order_id)
+        if scheduled is None:
+            return True
+        for line in scheduled[1]:
+            if line.station == station:
+                self.retire(line)
+        return all(line.done for line in scheduled[1])
+
+    def queue(self, station, limit=None):
+        # With a limit only the first few are picked out, not the whole heap
+        # sorted.
+        live = filter(self.live, self.queues[station])
+        if limit is None:
+            live = sorted(live)
+        else:
+            live = heapq.nsmallest(limit, live)
+        return [entry[3] for entry in live]
+
+    def station_tickets(self, station, limit=None):
+        # A station's queue grouped back into per-order tickets, most urgent
+        # order first.
+        tickets = {}
+        for line in self.queue(station, limit):
+            tickets.setdefault(line.order_id, []).append(line)
+        return tickets
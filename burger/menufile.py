@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import pickle
+
+from dataclasses import dataclass
+
+from .core import Menu, MenuItem
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_FORMAT = 1
+
+
+def parse_menu_file(path):
+    # {"options": [...], "items": [{"name", "price", "ingredients"}, ...]}
+    # as JSON, or the same shape as TOML ([[items]] tables).
+    if path.endswith(".toml"):
+        if tomllib is None:
+            raise ValueError("reading a TOML menu needs Python 3.11+ or tomli")
+        with open(path, "rb") as menu_file:
+            data = tomllib.load(menu_file)
+    else:
+        with open(path, encoding="utf-8") as menu_file:
+            data = json.load(menu_file)
+
+    items = []
+    for entry in data.get("items", []):
+        try:
+            name = str(entry["name"])
+            price = float(entry["price"])
+            ingredients = tuple(str(ingredient) for ingredient in entry["ingredients"])
+        except (KeyError, TypeError, ValueError) as error:
+            raise ValueError(f"bad menu item {entry!r} in {path}: {error}") from error
+        items.append((name, price, ingredients))
+    options = tuple(str(option) for option in data.get("options", []))
+    return tuple(items), options
+
+
+@dataclass(frozen=True)
+class MenuChange:
+    added: tuple = ()
+    removed: tuple = ()
+    reordered: bool = False
+    options_changed: bool = False
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.reordered or self.options_changed)
+
+
+def build_menu(definitions, previous=None):
+    # Items whose definition is unchanged keep their MenuItem, and with it
+    # their id, cached renders and popup row. A changed price or ingredient
+    # list makes a new item, so lines already in open orders keep pointing at
+    # the old one and keep its price.
+    items, options = definitions
+    known = previous.by_name if previous is not None else {}
+    burgers = []
+    for name, price, ingredients in items:
+        item = known.get(name)
+        if item is None or item.price_cents != round(price * 100) or item.ingredients != tuple(sorted(ingredients)):
+            item = MenuItem(name, price, ingredients)
+        burgers.append(item)
+    if previous is None:
+        return Menu(burgers, options=list(options)), MenuChange(added=tuple(burgers))
+
+    kept = {item.item_id for item in burgers}
+    old = {item.item_id for item in previous.burgers}
+    change = MenuChange(
+        added=tuple(item for item in burgers if item.item_id not in old),
+        removed=tuple(item for item in previous.burgers if item.item_id not in kept),
+        reordered=[item.item_id for item in burgers if item.item_id in old]
+        != [item.item_id for item in previous.burgers if item.item_id in kept],
+        options_changed=list(options) != previous.options,
+    )
+    version = previous.version + 1 if change else previous.version
+    return Menu(burgers, version=version, options=list(options)), change
+
+
+class MenuFile:
+    # A menu definition on disk plus a pickled copy of its parsed form, keyed
+    # by the source's mtime and size, so a cold start skips the parser.
+    def __init__(self, path, cache_path=None):
+        self.path = os.path.abspath(path)
+        self.cache_path = cache_path or self.path + ".cache"
+        self.loaded_key = None
+
+    def stat_key(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def read_definitions(self):
+        key = self.stat_key()
+        header = (CACHE_FORMAT, self.path, key)
+        try:
+            with open(self.cache_path, "rb") as cache:
+                if pickle.load(cache) == header:
+                    return key, pickle.load(cache)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            pass
+
+        definitions = parse_menu_file(self.path)
+        temporary = self.cache_path + ".tmp"
+        try:
+            with open(temporary, "wb") as cache:
+                pickle.dump(header, cache, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(definitions, cache, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, self.cache_path)
+        except OSError as error:
+            logger.warning("could not write menu cache %s: %s", self.cache_path, error)
+        return key, definitions
+
+    def load(self, previous=None):
+        key, definitions = self.read_definitions()
+        menu, change = build_menu(definitions, previous)
+        self.loaded_key = key
+        return menu, change
+
+    def changed(self):
+        try:
+            return self.stat_key() != self.loaded_key
+        except OSError:
+            return False
+
+    def reload(self, menu):
+        # Returns (menu, change) when the file has a new valid definition,
+        # None otherwise. A half-written or broken file keeps the current menu.
+        if not self.changed():
+            return None
+        try:
+            new_menu, change = self.load(menu)
+        except (OSError, ValueError) as error:
+            logger.warning("menu reload from %s failed: %s", self.path, error)
+            try:
+                self.loaded_key = self.stat_key()  # don't retry until it changes again
+            except OSError:
+                pass
+            return None
+        return (new_menu, change) if change else None
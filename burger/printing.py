@@ -0,0 +1,305 @@
+import logging
+import os
+import socket
+import threading
+import time
+
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from .engine import OrderListener
+from .telemetry import Histogram
+
+logger = logging.getLogger(__name__)
+
+ESC_INIT = b"\x1b@"
+ESC_BOLD_ON = b"\x1bE\x01"
+ESC_BOLD_OFF = b"\x1bE\x00"
+GS_DOUBLE = b"\x1d!\x11"
+GS_NORMAL = b"\x1d!\x00"
+ESC_ALIGN_CENTER = b"\x1ba\x01"
+ESC_ALIGN_LEFT = b"\x1ba\x00"
+ESC_FEED = b"\x1bd\x04"
+GS_CUT = b"\x1dVB\x00"
+
+CHIT = "chit"
+RECEIPT = "receipt"
+LINE_WIDTH = 42
+
+
+@dataclass(frozen=True)
+class PrintLine:
+    name: str
+    count: int
+    price_cents: int
+    added: tuple
+    removed: tuple
+    options: tuple
+
+
+@dataclass(frozen=True)
+class PrintJob:
+    # Everything the formatter needs, copied off the order on the UI thread
+    # so the worker never touches a live Order.
+    kind: str
+    order_id: str
+    customer_name: str
+    confirmed_at: float
+    lines: tuple
+    total_cents: int
+    queued_at: float
+
+    @property
+    def key(self):
+        return self.kind, self.order_id
+
+    @classmethod
+    def from_order(cls, kind, order):
+        return cls(
+            kind=kind,
+            order_id=order.order_id,
+            customer_name=order.customer_name,
+            confirmed_at=order.confirmed_at or time.time(),
+            lines=tuple(
+                PrintLine(
+                    burger.name,
+                    count,
+                    burger.price_cents,
+                    tuple(burger.added_ingredients),
+                    tuple(burger.removed_ingredients),
+                    tuple(burger.additional_options),
+                )
+                for burger, count in order.lines.items()
+            ),
+            total_cents=order.subtotal_cents,
+            queued_at=time.monotonic(),
+        )
+
+
+def text(value):
+    return value.encode("cp437", errors="replace") + b"\n"
+
+
+def money(cents):
+    return f"${cents // 100}.{cents % 100:02d}"
+
+
+def format_job(job):
+    # Same content as the rail ticket (name x count, NO / EXTRA ingredients,
+    # options) as ESC/POS bytes; receipts add prices and a total.
+    stamp = time.strftime("%H:%M", time.localtime(job.confirmed_at))
+    out = [ESC_INIT, ESC_ALIGN_CENTER, GS_DOUBLE]
+    out.append(text(job.customer_name or f"#{job.order_id[:8]}"))
+    out += [GS_NORMAL, text(f"{job.kind.upper()}  {stamp}"), ESC_ALIGN_LEFT]
+    for line in job.lines:
+        heading = f"{line.count}x {line.name}"
+        if job.kind == RECEIPT:
+            price = money(line.price_cents * line.count)
+            heading = heading[: LINE_WIDTH - len(price) - 1].ljust(LINE_WIDTH - len(price)) + price
+        out += [ESC_BOLD_ON, text(heading), ESC_BOLD_OFF]
+        out += [text(f"   NO {ingredient}") for ingredient in line.removed]
+        out += [text(f"   EXTRA {ingredient}") for ingredient in line.added]
+        out += [text(f"   ADD {option}") for option in line.options]
+    if job.kind == RECEIPT:
+        total = money(job.total_cents)
+        out += [ESC_BOLD_ON, text("TOTAL".ljust(LINE_WIDTH - len(total)) + total), ESC_BOLD_OFF]
+    out += [ESC_FEED, GS_CUT]
+    return b"".join(out)
+
+
+class FileSink:
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, data):
+        with open(self.path, "ab") as output:
+            output.write(data)
+            output.flush()
+            os.fsync(output.fileno())
+
+    def close(self):
+        pass
+
+
+class TcpSink:
+    # Raw port printers (JetDirect, 9100). The connection is kept open and
+    # re-dialled on the next write after any error.
+    def __init__(self, host, port=9100, timeout=5.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.sock = None
+
+    def write(self, data):
+        if self.sock is None:
+            self.sock = socket.create_connection((self.host, self.port), self.timeout)
+        try:
+            self.sock.sendall(data)
+        except OSError:
+            self.close()
+            raise
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+class LoopbackSink:
+    # Keeps what would have been printed; failures > 0 makes the next writes
+    # raise, like a printer out of paper.
+    def __init__(self, failures=0):
+        self.printed = []
+        self.failures = failures
+
+    def write(self, data):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("loopback printer jammed")
+        self.printed.append(data)
+
+    def close(self):
+        pass
+
+
+def parse_sink(spec):
+    # "tcp://host[:port]", "file:/path" or "loopback".
+    if spec == "loopback":
+        return LoopbackSink()
+    if spec.startswith("tcp://"):
+        host, _, port = spec[len("tcp://"):].partition(":")
+        return TcpSink(host, int(port or 9100))
+    if spec.startswith("file:"):
+        return FileSink(spec[len("file:"):])
+    raise ValueError(f"unknown printer {spec!r}")
+
+
+class PrintPipeline(OrderListener):
+    # order_confirmed only snapshots the order and queues it. A worker thread
+    # formats and writes; a failed write is retried with backoff while new
+    # jobs keep queueing behind it. A job queued again before it printed
+    # (same kind and order) replaces the waiting one, and past max_jobs the
+    # oldest waiting job is dropped, so a dead printer costs bounded memory
+    # and never blocks the caller.
+    def __init__(
+        self,
+        sink,
+        kinds=(CHIT, RECEIPT),
+        max_jobs=256,
+        max_attempts=5,
+        retry_delay=0.5,
+        max_retry_delay=30.0,
+    ):
+        self.sink = sink
+        self.kinds = kinds
+        self.max_jobs = max_jobs
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.jobs = OrderedDict()
+        self.condition = threading.Condition()
+        self.stopping = False
+        self.busy = False
+        self.thread = None
+        self.latency = Histogram()
+        self.max_depth = 0
+        self.printed = 0
+        self.retries = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def start(self):
+        self.thread = threading.Thread(target=self._print_loop, name="printer", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        # Gives queued jobs up to `timeout` to print, then leaves the daemon
+        # thread behind rather than hang shutdown on a jammed printer.
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join(timeout)
+        self.sink.close()
+
+    def order_confirmed(self, order):
+        for kind in self.kinds:
+            self.submit(PrintJob.from_order(kind, order))
+
+    def reprint(self, order, kind=CHIT):
+        self.submit(PrintJob.from_order(kind, order))
+
+    def submit(self, job):
+        with self.condition:
+            if job.key in self.jobs:
+                self.coalesced += 1
+            elif len(self.jobs) >= self.max_jobs:
+                self.jobs.popitem(last=False)
+                self.dropped += 1
+            self.jobs[job.key] = job
+            self.max_depth = max(self.max_depth, len(self.jobs))
+            self.condition.notify()
+
+    def flush(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while self.jobs or self.busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def metrics(self):
+        return {
+            "depth": len(self.jobs),
+            "max_depth": self.max_depth,
+            "printed": self.printed,
+            "retries": self.retries,
+            "failed": self.failed,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "latency": self.latency.summary(),
+        }
+
+    def _print_loop(self):
+        while True:
+            with self.condition:
+                while not self.jobs and not self.stopping:
+                    self.condition.wait()
+                if not self.jobs:
+                    return
+                _, job = self.jobs.popitem(last=False)
+                self.busy = True
+            try:
+                self._print(job, format_job(job))
+            finally:
+                with self.condition:
+                    self.busy = False
+                    self.condition.notify_all()
+
+    def _print(self, job, data):
+        delay = self.retry_delay
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self.sink.write(data)
+            except OSError as error:
+                if attempt == self.max_attempts:
+                    self.failed += 1
+                    logger.error("giving up on %s for %s: %s", job.kind, job.order_id, error)
+                    return
+                self.retries += 1
+                logger.warning("printer write failed (%s), retrying in %.1fs", error, delay)
+                with self.condition:
+                    if not self.stopping:
+                        self.condition.wait(delay)
+                    if self.stopping:
+                        self.failed += 1
+                        return
+                delay = min(delay * 2, self.max_retry_delay)
+            else:
+                self.printed += 1
+                self.latency.record(time.monotonic() - job.queued_at)
+                return
@@ -0,0 +1,57 @@
+FULL = object()
+
+
+class RefreshScheduler:
+    # UI regions are marked dirty instead of redrawn on the spot, and each
+    # dirty region is redrawn once when the trigger fires (the app uses a
+    # Kivy Clock trigger that runs just before the next frame is drawn).
+    # Keyed regions collect the keys marked since the last flush; marking
+    # one without a key asks for a full refresh, which absorbs the keys.
+    def __init__(self, create_trigger=None):
+        self.callbacks = {}
+        self.dirty = {}
+        self.requested = {}
+        self.flushed = {}
+        self.avoided = {}
+        self.trigger = create_trigger(self.flush) if create_trigger else None
+
+    def register(self, region, callback):
+        # callback(keys): keys is what was marked, in the order it was first
+        # marked (a dict used as an ordered set), or None for a full refresh.
+        self.callbacks[region] = callback
+        self.requested[region] = 0
+        self.flushed[region] = 0
+        self.avoided[region] = 0
+
+    def mark_dirty(self, region, key=None):
+        self.requested[region] += 1
+        pending = self.dirty.get(region)
+        if pending is FULL or (key is not None and pending is not None and key in pending):
+            self.avoided[region] += 1
+        elif key is None:
+            # Pending per-key refreshes are covered by the full one.
+            self.avoided[region] += len(pending) if pending else 0
+            self.dirty[region] = FULL
+        elif pending is None:
+            self.dirty[region] = {key: None}
+        else:
+            pending[key] = None
+        if self.trigger is not None:
+            self.trigger()
+
+    def flush(self, *args):
+        # Callbacks may mark regions again; those wait for the next flush.
+        dirty, self.dirty = self.dirty, {}
+        for region, keys in dirty.items():
+            self.flushed[region] += 1
+            self.callbacks[region](None if keys is FULL else keys)
+
+    def stats(self):
+        return {
+            region: {
+                "requested": self.requested[region],
+                "flushed": self.flushed[region],
+                "avoided": self.avoided[region],
+            }
+            for region in self.callbacks
+        }
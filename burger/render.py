@@ -0,0 +1,129 @@
+from collections import OrderedDict
+
+
+class RenderCache:
+    # Small LRU for rendered markup. Keys carry everything the text depends
+    # on; entries for items that leave the menu are dropped with evict().
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def evict(self, predicate):
+        stale = [key for key in self.entries if predicate(key)]
+        for key in stale:
+            del self.entries[key]
+        return len(stale)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
+
+
+class TicketRenderer:
+    # Markup for the kitchen tickets and the order summary. Plain strings
+    # only, so it runs the same with or without a Kivy window. Rendered text
+    # depends only on the lines' MenuItem objects, which never change once
+    # built, so a menu swap only needs to drop lines of items that left it.
+    def __init__(self, menu):
+        self.menu = menu
+        self.ticket_cache = RenderCache(maxsize=1024)
+        self.line_cache = RenderCache(maxsize=1024)
+        self.summary_cache = RenderCache(maxsize=1024)
+
+    def set_menu(self, menu, removed_items=()):
+        self.menu = menu
+        removed_ids = {item.item_id for item in removed_items}
+        if removed_ids:
+            self.line_cache.evict(lambda key: key[0][0] in removed_ids)
+            self.summary_cache.evict(lambda key: key[0][0] in removed_ids)
+
+    def construct_order_display(self, order_instance):
+        cached = self.ticket_cache.get(order_instance.order_id)
+        if cached is not None and cached[0] == order_instance.version:
+            return cached[1]
+        order_string = "".join(
+            self.render_order_line(burger, count)
+            for burger, count in order_instance.lines.items()
+        )
+        self.ticket_cache.put(
+            order_instance.order_id, (order_instance.version, order_string)
+        )
+        return order_string
+
+    def render_order_line(self, burger, count):
+        line_key = (burger.key, count)
+        line_string = self.line_cache.get(line_key)
+        if line_string is None:  # COLOR
+            line_string = f"[color=#ffea2e]\n{burger.name}[/color] x{count}\n[size=14]{self.get_ingredient_modifications(burger)}\n{self.get_additional_options(burger)}[/size]\n"
+            self.line_cache.put(line_key, line_string)
+        return line_string
+
+    def get_additional_options(self, burger):
+        additional_options =[]
+        if burger.additional_options:
+            for option in burger.additional_options:
+                additional_options.append(f'[color=00ff00]ADD {option}[/color]')
+        return "\n".join(additional_options)
+
+    def get_ingredient_modifications(self, burger):
+        modified_ingredients = []
+        for position, ing in enumerate(burger.item.ingredients):
+            bit = 1 << position
+            if burger.removed_mask & bit:
+                modified_ingredients.append(f"[color=ff0000]NO {ing}[/color]")
+            elif burger.added_mask & bit:
+                modified_ingredients.append(f"[color=00ff00]EXTRA {ing}[/color]")
+            else:
+                modified_ingredients.append(ing)
+        return "\n".join(modified_ingredients)
+
+    def summary_rows(self, order):
+        # One row per line for the order-entry summary list.
+        return [
+            {"burger": burger, "count": count, "text": self.summary_line(burger, count)}
+            for burger, count in order.lines.items()
+        ]
+
+    def summary_line(self, burger, count):
+        line_key = (burger.key, count)
+        line_string = self.summary_cache.get(line_key)
+        if line_string is None:
+            name = burger.name
+            price = burger.price_cents * count / 100
+            ingredient_info = []
+
+            if burger.removed_ingredients:
+                ingredient_info.append("No " + ", ".join(burger.removed_ingredients))
+
+            if burger.added_ingredients:
+                ingredient_info.append("Add: " + ", ".join(burger.added_ingredients))
+
+            if burger.additional_options:
+                ingredient_info.append("" + ", ".join(burger.additional_options))
+
+            ingredient_info_str = " | ".join(ingredient_info) if ingredient_info else ''
+            line_string = f"{count}x {name} {price}\n{ingredient_info_str}"
+            self.summary_cache.put(line_key, line_string)
+        return line_string
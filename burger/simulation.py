@@ -0,0 +1,276 @@
+import argparse
+import heapq
+import json
+import random
+import resource
+import sys
+import time
+import tracemalloc
+
+from dataclasses import dataclass
+
+from .core import populate_menu
+from .engine import OrderEngine
+
+OPERATIONS = ("add_item_to_order", "confirm_order", "order_complete")
+
+
+@dataclass
+class SimulationConfig:
+    arrival_rate: float = 2.0  # orders per minute
+    orders: int = 1000
+    max_items: int = 4
+    extra_probability: float = 0.1
+    remove_probability: float = 0.15
+    option_probability: float = 0.05
+    completion_mean: float = 8 * 60.0  # seconds from confirm to complete
+    completion_stddev: float = 3 * 60.0
+    seed: int = 1
+
+
+def random_line(rng, items, options, extra=0.1, remove=0.15, option=0.05):
+    # One order line: a random item with random extras, removals and options.
+    item = rng.choice(items)
+    return item.clone().modified(
+        added=[ing for ing in item.ingredients if rng.random() < extra],
+        removed=[ing for ing in item.ingredients if rng.random() < remove],
+        options=[name for name in options if rng.random() < option],
+    )
+
+
+def peak_rss():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class HeadlessTarget:
+    # Drives an OrderEngine directly, no UI.
+    def __init__(self, engine=None):
+        self.engine = engine or OrderEngine()
+
+    def add_item_to_order(self, burger):
+        self.engine.add_item_to_order(burger)
+
+    def confirm_order(self, customer_name):
+        return self.engine.confirm_order(customer_name)
+
+    def order_complete(self, order_id):
+        self.engine.order_complete(order_id)
+
+
+class AppTarget:
+    # Drives a running BurgerApp through the same handlers the buttons use,
+    # flushing its batched redraws after each step as the next frame would.
+    def __init__(self, app):
+        self.app = app
+
+    def add_item_to_order(self, burger):
+        if self.app.add_order_popup is None:
+            self.app.build_add_order_popup()
+        self.app.add_item_to_order(burger)
+        self.app.refresh.flush()
+
+    def confirm_order(self, customer_name):
+        order = self.app.current_order
+        self.app.name_text_input.text = customer_name or ""
+        self.app.confirm_order(None)
+        self.app.refresh.flush()
+        return order
+
+    def order_complete(self, order_id):
+        self.app.order_complete(order_id=order_id)
+        self.app.refresh.flush()
+
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def at(fraction):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000
+
+    return {
+        "count": len(ordered),
+        "p50_ms": at(0.5),
+        "p90_ms": at(0.9),
+        "p99_ms": at(0.99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+class Simulation:
+    # Discrete-event rush: orders arrive as a Poisson stream, are built line
+    # by line from the menu and default options, confirmed, and completed
+    # after a randomised kitchen time. Every step goes through the target's
+    # add_item_to_order / confirm_order / order_complete, and is timed.
+    # available, when given, says whether a menu item can be ordered right
+    # now; a customer who finds nothing available is turned away.
+    def __init__(self, target, config=None, menu=None, options=None, available=None):
+        self.target = target
+        self.config = config or SimulationConfig()
+        self.menu = menu or populate_menu()
+        self.options = options or list(self.menu.options)
+        self.available = available
+        self.rng = random.Random(self.config.seed)
+        self.events = []
+        self.sequence = 0
+        self.clock = 0.0
+        self.arrivals = 0
+        self.turned_away = 0
+        self.completed = 0
+        self.latencies = {operation: [] for operation in OPERATIONS}
+        self.schedule(self.rng.expovariate(self.config.arrival_rate / 60.0), "arrival")
+
+    def schedule(self, at, kind, payload=None):
+        self.sequence += 1
+        heapq.heappush(self.events, (at, self.sequence, kind, payload))
+
+    @property
+    def finished(self):
+        return not self.events
+
+    def timed(self, operation, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        self.latencies[operation].append(time.perf_counter() - start)
+        return result
+
+    def random_line(self):
+        config = self.config
+        items = self.menu.burgers
+        if self.available is not None:
+            items = [item for item in items if self.available(item)]
+        if not items:
+            return None
+        return random_line(
+            self.rng,
+            items,
+            self.options,
+            config.extra_probability,
+            config.remove_probability,
+            config.option_probability,
+        )
+
+    def arrive(self):
+        config = self.config
+        lines = [self.random_line() for _ in range(self.rng.randint(1, config.max_items))]
+        if None in lines:
+            self.turned_away += 1
+        else:
+            for line in lines:
+                self.timed("add_item_to_order", self.target.add_item_to_order, line)
+            order = self.timed(
+                "confirm_order", self.target.confirm_order, f"customer {self.arrivals}"
+            )
+            self.arrivals += 1
+            kitchen_time = max(
+                30.0, self.rng.gauss(config.completion_mean, config.completion_stddev)
+            )
+            self.schedule(self.clock + kitchen_time, "complete", order.order_id)
+        if self.arrivals + self.turned_away < config.orders:
+            self.schedule(
+                self.clock + self.rng.expovariate(config.arrival_rate / 60.0), "arrival"
+            )
+
+    def advance(self, until):
+        # Process every event due by simulated time `until`.
+        while self.events and self.events[0][0] <= until:
+            self.clock, _, kind, payload = heapq.heappop(self.events)
+            if kind == "arrival":
+                self.arrive()
+            else:
+                self.timed("order_complete", self.target.order_complete, payload)
+                self.completed += 1
+
+    def run(self, realtime=False, speedup=1.0):
+        start = time.perf_counter()
+        while self.events:
+            if realtime:
+                delay = self.events[0][0] / speedup - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            self.advance(self.events[0][0])
+        return self.report(time.perf_counter() - start)
+
+    def report(self, wall_time):
+        report = {
+            "orders": self.arrivals,
+            "turned_away": self.turned_away,
+            "completed": self.completed,
+            "simulated_seconds": self.clock,
+            "wall_seconds": wall_time,
+            "orders_per_second": self.arrivals / wall_time if wall_time else None,
+            "latency": {
+                operation: percentiles(samples)
+                for operation, samples in self.latencies.items()
+            },
+            "peak_rss_bytes": peak_rss(),
+        }
+        if tracemalloc.is_tracing():
+            report["peak_traced_bytes"] = tracemalloc.get_traced_memory()[1]
+        return report
+
+
+def format_report(report):
+    lines = [
+        f"orders: {report['orders']}  completed: {report['completed']}  "
+        f"turned away: {report['turned_away']}",
+        f"simulated: {report['simulated_seconds'] / 60:.1f} min  "
+        f"wall: {report['wall_seconds']:.3f} s  "
+        f"throughput: {report['orders_per_second']:.0f} orders/s",
+    ]
+    for operation, stats in report["latency"].items():
+        if stats:
+            lines.append(
+                f"  {operation:<18} n={stats['count']:<7} "
+                f"p50={stats['p50_ms']:.3f} ms  p90={stats['p90_ms']:.3f} ms  "
+                f"p99={stats['p99_ms']:.3f} ms  max={stats['max_ms']:.3f} ms"
+            )
+    lines.append(f"peak rss: {report['peak_rss_bytes'] / 2**20:.1f} MiB")
+    if "peak_traced_bytes" in report:
+        lines.append(f"peak traced: {report['peak_traced_bytes'] / 2**20:.1f} MiB")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a rush against the order engine")
+    defaults = SimulationConfig()
+    parser.add_argument("--orders", type=int, default=defaults.orders)
+    parser.add_argument("--rate", type=float, default=defaults.arrival_rate, help="orders per minute")
+    parser.add_argument("--max-items", type=int, default=defaults.max_items)
+    parser.add_argument("--extra", type=float, default=defaults.extra_probability)
+    parser.add_argument("--remove", type=float, default=defaults.remove_probability)
+    parser.add_argument("--option", type=float, default=defaults.option_probability)
+    parser.add_argument("--completion-mean", type=float, default=defaults.completion_mean)
+    parser.add_argument("--completion-stddev", type=float, default=defaults.completion_stddev)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--realtime", action="store_true", help="sleep between events")
+    parser.add_argument("--speedup", type=float, default=1.0)
+    parser.add_argument("--tracemalloc", action="store_true", help="also report peak traced memory")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    config = SimulationConfig(
+        arrival_rate=args.rate,
+        orders=args.orders,
+        max_items=args.max_items,
+        extra_probability=args.extra,
+        remove_probability=args.remove,
+        option_probability=args.option,
+        completion_mean=args.completion_mean,
+        completion_stddev=args.completion_stddev,
+        seed=args.seed,
+    )
+    if args.tracemalloc:
+        tracemalloc.start()
+    report = Simulation(HeadlessTarget(), config).run(args.realtime, args.speedup)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from collections import Counter
+
+from .core import Order, populate_menu
+from .engine import OrderEngine
+from .journal import OrderJournal
+from .kitchen import KitchenScheduler
+from .render import TicketRenderer
+from .simulation import peak_rss, random_line
+
+# Stores that keep every sale on purpose; they grow with the shift, not
+# with a leak.
+INTENTIONAL_GROWTH = ("*/burger/analytics.py",)
+
+
+class EngineSoak:
+    # The headless stack: engine, journal, renderer and kitchen scheduler,
+    # driven through the same calls the app makes.
+    def __init__(self, directory, seed=1, open_orders=20):
+        self.menu = populate_menu()
+        self.rng = random.Random(seed)
+        self.open_orders = open_orders
+        self.engine = OrderEngine()
+        self.renderer = TicketRenderer(self.menu)
+        self.scheduler = KitchenScheduler()
+        self.journal = OrderJournal(os.path.join(directory, "journal"))
+        self.journal.recover(self.engine, self.menu)
+        self.journal.open(self.engine)
+        self.engine.add_listener(self.journal)
+
+    def cycle(self, index):
+        for _ in range(self.rng.randint(1, 3)):
+            line = random_line(self.rng, self.menu.burgers, self.menu.options)
+            self.engine.add_item_to_order(line, self.rng.randint(1, 2))
+            self.renderer.summary_rows(self.engine.current_order)
+        order = self.engine.confirm_order(f"guest {index}")
+        self.scheduler.update(order)
+        self.renderer.construct_order_display(order)
+        if len(self.engine.existing_orders) > self.open_orders:
+            oldest = next(iter(self.engine.existing_orders))
+            self.engine.order_complete(oldest)
+            self.scheduler.remove(oldest)
+
+    def settle(self):
+        self.journal.flush()
+
+    def close(self):
+        self.journal.close()
+
+
+class AppSoak:
+    # A BurgerApp without a running loop: popups are opened, toggles tapped
+    # and tickets completed through the app's own handlers. Batched redraws,
+    # texture uploads and popup animations are run by hand every few cycles.
+    def __init__(self, directory, seed=1, open_orders=20):
+        os.environ["BURGER_DATA_DIR"] = directory
+        os.environ.setdefault("KIVY_NO_ARGS", "1")
+        from kivy.cache import Cache
+        from kivy.clock import Clock
+
+        import main
+
+        self.cache = Cache
+        self.clock = Clock
+        self.toggle_class = main.ToggleMDFlatButton
+        self.app = main.BurgerApp()
+        self.app.root = self.app.build()
+        self.rng = random.Random(seed)
+        self.open_orders = open_orders
+
+    def cycle(self, index):
+        app = self.app
+        rng = self.rng
+        app.open_add_order_popup()
+        for _ in range(rng.randint(1, 3)):
+            item = rng.choice(app.menu.burgers)
+            if rng.random() < 0.5:
+                app.add_item_to_order(item.clone())
+                continue
+            app.open_modify_item_popup(item.clone())
+            rows = app.modify_item_rows[: len(item.ingredients)]
+            rows += list(app.modify_option_rows.values())
+            for row in rng.sample(rows, min(2, len(rows))):
+                buttons = [child for child in row.children if isinstance(child, self.toggle_class)]
+                rng.choice(buttons).dispatch("on_release")
+            app.confirm_modifications(burger=app.modify_burger)
+        app.name_text_input.text = f"guest {index}"
+        app.confirm_order(None)
+        if len(app.existing_orders) > self.open_orders:
+            app.ticket_rail.complete_ticket(next(iter(app.existing_orders)))
+        app.refresh.flush()
+        if index % 50 == 0:
+            self.settle()
+
+    def settle(self):
+        # Kivy's label caches expire on a 60 s timer; thousands of cycles
+        # run inside one window, so drop them instead of waiting.
+        for category in list(self.cache._categories):
+            self.cache.remove(category)
+        self.app.refresh.flush()
+        self.clock.tick()
+        self.app.text_prerenderer.upload()
+        self.app.journal.flush()
+        self.app.history.flush()
+
+    def close(self):
+        self.app.on_stop()
+
+
+def object_counts():
+    return Counter(type(obj).__qualname__ for obj in gc.get_objects())
+
+
+def take_snapshot(driver, exclude):
+    driver.settle()
+    gc.collect()
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        [
+            tracemalloc.Filter(False, pattern)
+            for pattern in (__file__, tracemalloc.__file__, *INTENTIONAL_GROWTH, *exclude)
+        ]
+    )
+    return snapshot, object_counts()
+
+
+def traced_size(snapshot):
+    return sum(stat.size for stat in snapshot.statistics("filename"))
+
+
+def counted_growth(new, old):
+    # Only sites that gained blocks. One whose count didn't change just
+    # resized what it already held (a bounded OrderedDict or heap
+    # reallocating as it churns) and is left to the total limit; memory
+    # freed elsewhere must not offset a leak either.
+    return sum(
+        stat.size_diff for stat in new.compare_to(old, "lineno") if stat.count_diff > 0
+    )
+
+
+def soak(driver, warmup, cycles, top=15, threshold=64.0, allowance=1 << 20, exclude=()):
+    # Warm-up fills the bounded caches (render LRUs, completed and archived
+    # orders, pooled popups). The measured cycles run as two windows: steady
+    # growth shows in both, a one-off high-water mark (a bigger text surface,
+    # a dict resize) only in one. The smaller window, counting only sites
+    # that gained blocks, is held to threshold per cycle, and the total to
+    # the same plus a one-off allowance, so a leak that steps up once still
+    # fails.
+    for index in range(warmup):
+        driver.cycle(index)
+    before, objects_before = take_snapshot(driver, exclude)
+    half = max(cycles // 2, 1)
+    start = time.perf_counter()
+    for index in range(warmup, warmup + half):
+        driver.cycle(index)
+    middle = take_snapshot(driver, exclude)[0]
+    for index in range(warmup + half, warmup + 2 * half):
+        driver.cycle(index)
+    elapsed = time.perf_counter() - start
+    after, objects_after = take_snapshot(driver, exclude)
+    cycles = 2 * half
+
+    growth = traced_size(after) - traced_size(before)
+    windows = [counted_growth(middle, before), counted_growth(after, middle)]
+    sites = [
+        {
+            "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_diff": stat.size_diff,
+            "count_diff": stat.count_diff,
+        }
+        for stat in after.compare_to(before, "lineno")[:top]
+        if stat.size_diff > 0
+    ]
+    objects = objects_after.copy()
+    objects.subtract(objects_before)
+    types = [
+        {"type": name, "count_diff": diff, "per_cycle": diff / cycles}
+        for name, diff in objects.most_common(top)
+        if diff > 0
+    ]
+    per_cycle = min(windows) / half
+    total_limit = threshold * cycles + allowance
+    return {
+        "warmup": warmup,
+        "cycles": cycles,
+        "cycles_per_second": cycles / elapsed,
+        "growth_bytes": growth,
+        "window_growth_bytes": windows,
+        "growth_per_cycle": per_cycle,
+        "threshold_per_cycle": threshold,
+        "total_limit_bytes": total_limit,
+        "passed": per_cycle <= threshold and growth <= total_limit,
+        "orders_in_registry": len(Order.registry),
+        "peak_rss_bytes": peak_rss(),
+        "sites": sites,
+        "types": types,
+    }
+
+
+def format_report(report):
+    lines = [
+        f"{report['cycles']} cycles after {report['warmup']} warm-up "
+        f"({report['cycles_per_second']:.0f}/s), registry holds {report['orders_in_registry']} orders",
+        f"traced growth: {report['growth_bytes']} bytes (limit {report['total_limit_bytes']:.0f}), "
+        f"windows {report['window_growth_bytes'][0]} / {report['window_growth_bytes'][1]}",
+        f"steady growth: {report['growth_per_cycle']:.1f} bytes/cycle "
+        f"(limit {report['threshold_per_cycle']:g})",
+        f"peak rss: {report['peak_rss_bytes'] / 2**20:.1f} MiB",
+        "retained by allocation site:",
+    ]
+    lines += [
+        f"  {site['size_diff']:>+10} B {site['count_diff']:>+7}  {site['site']}"
+        for site in report["sites"]
+    ] or ["  (none)"]
+    lines.append("retained objects by type:")
+    lines += [
+        f"  {entry['count_diff']:>+8}  ({entry['per_cycle']:.3f}/cycle)  {entry['type']}"
+        for entry in report["types"]
+    ] or ["  (none)"]
+    if report["passed"]:
+        lines.append("PASS")
+    elif report["growth_per_cycle"] > report["threshold_per_cycle"]:
+        lines.append("FAIL: memory grows per cycle")
+    else:
+        lines.append("FAIL: memory grew past the one-off allowance")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak the order flow and report retained memory")
+    parser.add_argument("--cycles", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=3000)
+    parser.add_argument("--threshold", type=float, default=64.0, help="allowed bytes per cycle")
+    parser.add_argument(
+        "--allowance",
+        type=int,
+        default=1 << 20,
+        help="one-off growth allowed over the whole run, in bytes",
+    )
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--app", action="store_true", help="drive the Kivy app instead of the engine")
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        help="ignore allocations from files matching this pattern (repeatable)",
+    )
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    with tempfile.TemporaryDirectory() as directory:
+        driver = (AppSoak if args.app else EngineSoak)(directory, args.seed)
+        try:
+            report = soak(
+                driver,
+                args.warmup,
+                args.cycles,
+                args.top,
+                args.threshold,
+                args.allowance,
+                args.exclude,
+            )
+        finally:
+            driver.close()
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+    sys.exit(0 if report["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import functools
+import json
+import math
+import socket
+import threading
+import time
+
+SUB_BUCKETS = 8  # per power of two, so bucket edges are ~9% apart
+MAX_EXPONENT = 40  # 2**40 us, anything slower lands in the last bucket
+
+
+class Histogram:
+    # Log-linear buckets over microseconds: recording is a frexp and an
+    # increment, percentiles are read back from the bucket counts.
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (MAX_EXPONENT * SUB_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        micros = seconds * 1e6
+        if micros < 1.0:
+            index = 0
+        else:
+            mantissa, exponent = math.frexp(micros)
+            index = min(
+                exponent * SUB_BUCKETS + int((mantissa - 0.5) * 2 * SUB_BUCKETS),
+                len(self.counts) - 1,
+            )
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @staticmethod
+    def bucket_upper(index):
+        exponent, sub = divmod(index, SUB_BUCKETS)
+        return math.ldexp(0.5 + (sub + 1) / (2 * SUB_BUCKETS), exponent) / 1e6
+
+    def percentile(self, fraction):
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(list(self.counts)):
+            seen += count
+            if count and seen >= rank:
+                return min(self.bucket_upper(index), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(0.5) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class Telemetry:
+    def __init__(self):
+        self.histograms = {}
+        self.started = {}
+        self.exporter = None
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+
+    def record(self, name, seconds):
+        self.histogram(name).record(seconds)
+
+    def timed(self, name, fn):
+        histogram = self.histogram(name)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.record(time.perf_counter() - start)
+
+        return wrapper
+
+    def instrument(self, target, *names):
+        # Replaces the bound methods on this instance only; the class and
+        # any uninstrumented instance keep the plain methods.
+        for name in names:
+            setattr(target, name, self.timed(name, getattr(target, name)))
+
+    def begin(self, name):
+        self.started[name] = time.perf_counter()
+
+    def end(self, name):
+        start = self.started.pop(name, None)
+        if start is not None:
+            self.record(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        return {
+            name: histogram.summary()
+            for name, histogram in list(self.histograms.items())
+        }
+
+    def format(self):
+        return "\n".join(
+            f"{name}: p50 {stats['p50_ms']:.2f} ms  p99 {stats['p99_ms']:.2f} ms"
+            for name, stats in sorted(self.snapshot().items())
+            if stats["count"]
+        )
+
+    def start_exporter(self, destination, interval=5.0):
+        self.exporter = TelemetryExporter(self, destination, interval).start()
+        return self.exporter
+
+    def stop(self):
+        if self.exporter is not None:
+            self.exporter.stop()
+            self.exporter = None
+
+
+class TelemetryExporter:
+    # Writes one JSON snapshot per interval, either appended to a file or
+    # sent as a UDP datagram for "udp://host:port" destinations.
+    def __init__(self, telemetry, destination, interval=5.0):
+        self.telemetry = telemetry
+        self.destination = destination
+        self.interval = interval
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="telemetry", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.thread.join()
+
+    def run(self):
+        if self.destination.startswith("udp://"):
+            host, _, port = self.destination[len("udp://"):].rpartition(":")
+            address = (host or "127.0.0.1", int(port))
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+            def send(payload):
+                try:
+                    sock.sendto(payload.encode("utf-8"), address)
+                except OSError:
+                    pass
+
+            close = sock.close
+        else:
+            output = open(self.destination, "a", encoding="utf-8")
+
+            def send(payload):
+                output.write(payload + "\n")
+                output.flush()
+
+            close = output.close
+        try:
+            while not self.stopping.wait(self.interval):
+                send(self.payload())
+            send(self.payload())
+        finally:
+            close()
+
+    def payload(self):
+        return json.dumps({"time": time.time(), "metrics": self.telemetry.snapshot()})
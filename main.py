@@ -1,19 +1,37 @@
+import os
+import queue
+import threading
+
+from collections import OrderedDict, deque
+
+import kivy
+
 from kivy.config import Config
 
 Config.set("graphics", "multisamples", "8")
 Config.set("graphics", "kivy_clock", "interrupt")
 Config.set("kivy", "exit_on_escape", "0")
 
-import uuid
-
-from collections import Counter
-from dataclasses import dataclass, field
-
-from kivy.core.window import Window
 from kivy.uix.popup import Popup
 from kivy.clock import Clock
 from kivy.uix.textinput import TextInput
-from kivy.properties import ListProperty, StringProperty, BooleanProperty
+from kivy.core.text.markup import MarkupLabel as CoreMarkupLabel
+from kivy.graphics import Color, Rectangle
+from kivy.graphics.texture import Texture
+from kivy.logger import Logger
+from kivy.metrics import dp, sp
+from kivy.properties import (
+    BooleanProperty,
+    ListProperty,
+    NumericProperty,
+    ObjectProperty,
+    StringProperty,
+)
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.scrollview import ScrollView
+from kivy.uix.widget import Widget
 
 from kivymd.app import MDApp
 from kivymd.uix.gridlayout import MDGridLayout
@@ -21,156 +39,30 @@ from kivymd.uix.boxlayout import MDBoxLayout
 from kivymd.uix.label import MDLabel
 from kivymd.uix.button import MDFlatButton, MDIconButton
 
-
-Window.maximize()
-# Window.borderless = True
-
-
-@dataclass(eq=False)
-class Burger:
-    name: str
-    price: float
-    ingredients: list[str]
-    added_ingredients: list[str] = field(default_factory=list)
-    removed_ingredients: list[str] = field(default_factory=list)
-    additional_options: list[str] = field(default_factory=list)
-    button_states: dict[str] = field(default_factory=dict)
-    additional_options_button_states: dict[str] = field(default_factory=dict)
-    # added_ingredients: list[str] = field(default_factory=lambda: ["onion"]) testing
-    # removed_ingredients: list[str] = field(default_factory=lambda: ["lettuce"])
-
-    def __post_init__(self):
-        self.ingredients = sorted(self.ingredients)
-
-    def __hash__(self):
-        return hash(
-            (
-                self.name,
-                tuple(self.ingredients),
-                tuple(sorted(self.added_ingredients)),
-                tuple(sorted(self.removed_ingredients)),
-            )
-        )
-
-    def __eq__(self, other):
-        if not isinstance(other, Burger):
-            return NotImplemented
-        return (
-            self.name == other.name
-            and self.ingredients == other.ingredients
-            and self.added_ingredients == other.added_ingredients
-            and self.removed_ingredients == other.removed_ingredients
-        )
-
-    def add_ingredient(self, ingredient: str):
-        if (
-            ingredient not in self.ingredients
-            and ingredient not in self.added_ingredients
-        ):
-            self.added_ingredients.append(ingredient)
-
-    def clone(self):
-        # print(f'Inside clone function, current ID is {id(self)}')
-        cloned_burger = Burger(
-            self.name,
-            self.price,
-            self.ingredients,
-            added_ingredients=[],
-            removed_ingredients=[],
-            additional_options=[],
-            button_states={},
-            additional_options_button_states={},
-        )
-        # print(f"Cloning burger - new ID: {id(cloned_burger)}")
-        return cloned_burger
-
-    def remove_ingredient(self, ingredient: str):
-        if (
-            ingredient in self.ingredients
-            and ingredient not in self.removed_ingredients
-        ):
-            self.removed_ingredients.append(ingredient)
-            self.ingredients.remove(ingredient)
-
-    def display_ingredients(self):
-        ingredients_display = []
-        for ingredient in self.ingredients:
-            if ingredient in self.removed_ingredients:
-                ingredients_display.append(f"NO {ingredient}")
-            else:
-                ingredients_display.append(ingredient)
-        for ingredient in self.added_ingredients:
-            ingredients_display.append(f"ADD {ingredient}")
-        return ", ".join(ingredients_display)
-
-    def display_modifications(self):
-        add_items = []
-        remove_items = []
-        if self.added_ingredients:
-            add_items.extend(ing for ing in self.added_ingredients)
-        if self.removed_ingredients:
-            remove_items.extend(ing for ing in self.removed_ingredients)
-        return add_items, remove_items
-
-
-@dataclass
-class Menu:
-    burgers: list[Burger] = field(default_factory=list)
-
-    def add_burger(self, burger: Burger):
-        self.burgers.append(burger)
-
-    def remove_burger(self, burger_name: str):
-        self.burgers = [burger for burger in self.burgers if burger.name != burger_name]
-
-    def find_burger(self, burger_name: str):
-        return next(
-            (burger for burger in self.burgers if burger.name == burger_name), None
-        )
-
-    def display_menu(self):
-        pass
-        # for burger in self.burgers
-
-
-class Order:
-    order_id: str
-    customer_name: str
-    existing_orders = {}
-
-    def __new__(cls, order_id):
-        if order_id in cls.existing_orders:
-            return cls.existing_orders[order_id]
-
-        instance = super(Order, cls).__new__(cls)
-        cls.existing_orders[order_id] = instance
-        return instance
-
-    def __init__(self, order_id):
-        if not hasattr(self, "initialized"):
-            self.order_id = order_id
-            self.burgers = []
-            self.initialized = True
-
-    def count_identical_burgers(self):
-
-        burger_counts = Counter(self.burgers)
-        return dict(burger_counts.items())
-
-    def add_burger(self, burger):
-        self.burgers.append(burger)
-
-    def remove_burger(self, burger):
-        self.burgers.remove(burger)
-
-    def total_price(self):
-        return sum(burger.price for burger in self.burgers)
-
-    def order_details(self):
-        detail = ""
-        for burger in self.burgers:
-            detail += f"{burger.name}: {burger.display_ingredients()}\n"
-        return detail
+from burger.analytics import SalesStore
+from burger.bus import (
+    STATION_DONE,
+    BusPublisher,
+    OrderBusThread,
+    apply_event,
+    apply_station_done,
+    parse_address,
+)
+from burger.history import OrderHistory
+from burger.inventory import Inventory
+from burger.journal import OrderJournal
+from burger.kitchen import KitchenScheduler
+from burger.printing import PrintPipeline, parse_sink
+from burger.refresh import RefreshScheduler
+from burger.menufile import MenuFile
+from burger.simulation import AppTarget, Simulation, SimulationConfig
+from burger.telemetry import Telemetry
+from burger import (
+    Burger,
+    OrderEngine,
+    TicketRenderer,
+    populate_menu,
+)
 
 
 ############################################################################################################################################################
@@ -182,10 +74,73 @@ class BurgerApp(MDApp):
     def __init__(self, **kwargs):
         super(BurgerApp, self).__init__(**kwargs)
 
+        menu_path = os.environ.get("BURGER_MENU")
+        self.menu_file = MenuFile(menu_path) if menu_path else None
         self.menu = self.populate_menu()
-        self.current_order = None
-        self.existing_orders = []
-        self.button_states = {}
+        self.engine = OrderEngine()
+        self.renderer = TicketRenderer(self.menu)
+        self.ingredient_modifiers = {}
+        self.option_modifiers = {}
+        self.add_order_popup = None
+        self.modify_item_popup = None
+        self.modify_item_popup_stale = False
+        self.modify_burger = None
+        self.order_bus = None
+        self.bus_publisher = None
+        self.simulation = None
+        # A station display (BURGER_STATION=grill, ...) shows only the lines
+        # routed to it, most urgent first, and no more than fit on screen.
+        self.station = os.environ.get("BURGER_STATION")
+        self.station_lines = int(os.environ.get("BURGER_STATION_LINES", "40"))
+        self.scheduler = KitchenScheduler()
+        self.text_prerenderer = TextPrerenderer().start()
+        # Summary, total and rail redraws are batched to once per frame.
+        self.refresh = RefreshScheduler(lambda flush: Clock.create_trigger(flush, -1))
+        self.refresh.register("summary", lambda keys: self.update_right_side_order_contents())
+        self.refresh.register("total", lambda keys: self.update_order_total())
+        self.refresh.register("rail", self.refresh_rail)
+
+        # Bring back whatever was open when the app last stopped or crashed.
+        self.journal = OrderJournal(os.path.join(self.data_directory(), "journal"))
+        self.journal.recover(self.engine, self.menu)
+        self.journal.open(self.engine)
+        self.engine.add_listener(self.journal)
+        self.history = OrderHistory(
+            os.path.join(self.data_directory(), "history.sqlite3")
+        ).open()
+        self.engine.add_listener(self.history)
+        self.sales_path = os.path.join(self.data_directory(), "sales.pickle")
+        self.sales = SalesStore.load(self.sales_path)
+        self.sales.catch_up(self.history, self.menu)
+        self.engine.add_listener(self.sales)
+        # Added after recovery, so replayed orders don't consume stock twice.
+        self.inventory_path = os.path.join(self.data_directory(), "inventory.json")
+        self.inventory = Inventory.load(self.inventory_path, self.menu)
+        self.inventory.listeners.append(self.update_item_availability)
+        self.engine.add_listener(self.inventory)
+        self.printer = None
+        printer = os.environ.get("BURGER_PRINTER")
+        if printer:
+            self.printer = PrintPipeline(parse_sink(printer)).start()
+            self.engine.add_listener(self.printer)
+
+        # Off by default; when off nothing is wrapped and nothing is scheduled.
+        self.telemetry = None
+        self.telemetry_overlay = None
+        self.tapped_order_id = None
+        if os.environ.get("BURGER_TELEMETRY"):
+            self.enable_telemetry()
+
+    def data_directory(self):
+        return os.environ.get("BURGER_DATA_DIR") or self.user_data_dir
+
+    @property
+    def current_order(self):
+        return self.engine.current_order
+
+    @property
+    def existing_orders(self):
+        return self.engine.existing_orders
 
     def create_main_layout(self):
         layout = MDGridLayout(
@@ -208,39 +163,11 @@ class BurgerApp(MDApp):
             padding=[10, 10, 10, 10],
             spacing=10,
         )
-        order_layout = MDGridLayout(
-            orientation="tb-lr", cols=5, rows=2, padding=[10, 10, 10, 10], spacing=10
-        )
-
-        # Orders
-        for i in range(1, 6):  # 5 orders on screen at a time
-            setattr(
-                self,
-                f"order_{i}",
-                MDLabel(
-                    text="",
-                    padding=(50, 50, 50, 50),
-                    font_style="H6",
-                    markup=True,
-                    size_hint_y=0.9,
-                ),
-            )
-            setattr(
-                self,
-                f"order_{i}_button",
-                MDFlatButton(
-                    text="",
-                    on_release=self.do_nothing,
-                    _no_ripple_effect=True,
-                    size_hint_y=1,
-                    _min_width=200,
-                    _min_height=75,
-                ),
-            )
-            order_layout.add_widget(getattr(self, f"order_{i}"))
-            order_layout.add_widget(getattr(self, f"order_{i}_button"))
-
-        layout.add_widget(order_layout)
+        # Orders, only the tickets that fit on screen get widgets
+        self.ticket_rail = TicketRail(
+            on_ticket_complete=self.ticket_complete, prerenderer=self.text_prerenderer
+        )
+        layout.add_widget(self.ticket_rail)
         return layout
 
     def create_bottom_layout(self):
@@ -257,6 +184,18 @@ class BurgerApp(MDApp):
             padding=(0, 0, 0, 150),
             on_release=lambda x: self.open_add_order_popup(),
         )
+        _blank.add_widget(
+            MDIconButton(
+                icon="chevron-left",
+                on_release=lambda x: self.ticket_rail.page(-1),
+            )
+        )
+        _blank2.add_widget(
+            MDIconButton(
+                icon="chevron-right",
+                on_release=lambda x: self.ticket_rail.page(1),
+            )
+        )
         button_layout.add_widget(_blank)
         button_layout.add_widget(button)
         button_layout.add_widget(_blank2)
@@ -271,40 +210,216 @@ class BurgerApp(MDApp):
         self.theme_cls.primary_palette = "Orange"
 
         layout = self.create_main_layout()
+        self.update_order()
         return layout
 
+    def on_start(self):
+        from kivy.core.window import Window
+
+        Window.maximize()
+        # Window.borderless = True
+
+        bus_address = os.environ.get("BURGER_ORDER_BUS")
+        if bus_address:
+            self.start_order_bus(*parse_address(bus_address))
+
+        if self.telemetry is not None:
+            self.start_telemetry(
+                overlay=os.environ.get("BURGER_TELEMETRY") == "overlay",
+                export=os.environ.get("BURGER_TELEMETRY_EXPORT"),
+            )
+
+        if self.menu_file is not None:
+            Clock.schedule_interval(self.reload_menu, 2)
+        Clock.schedule_interval(self.save_inventory, 30)
+
+        simulate_rate = os.environ.get("BURGER_SIMULATE")
+        if simulate_rate:
+            self.start_simulation(float(simulate_rate))
+
+    def on_stop(self):
+        if self.order_bus is not None:
+            self.order_bus.stop()
+        if self.telemetry is not None:
+            self.telemetry.stop()
+        if self.printer is not None:
+            self.printer.stop()
+        self.text_prerenderer.stop()
+        self.journal.close()
+        self.history.close()
+        self.sales.save(self.sales_path)
+        self.inventory.save(self.inventory_path)
+
+    def save_inventory(self, dt=None):
+        if self.inventory.dirty:
+            self.inventory.save(self.inventory_path)
+
+    def start_order_bus(self, host, port):
+        self.order_bus = OrderBusThread(host, port).start()
+        self.bus_publisher = BusPublisher(self.order_bus)
+        self.engine.add_listener(self.bus_publisher)
+        Clock.schedule_interval(self.drain_order_bus, 0)
+
+    def reload_menu(self, dt=None):
+        reloaded = self.menu_file.reload(self.menu)
+        if reloaded is None:
+            return
+        # Swap the whole menu at once; the old items live on in open orders.
+        self.menu, change = reloaded
+        self.renderer.set_menu(self.menu, change.removed)
+        if self.simulation is not None:
+            self.simulation.menu = self.menu
+            self.simulation.options = self.get_default_options()
+        self.inventory.set_menu(self.menu)
+        if change.options_changed:
+            # The popup may be open right now; rebuild it on its next open.
+            self.modify_item_popup_stale = True
+        if self.add_order_popup is not None and self.add_order_popup._window is not None:
+            self.add_inventory_to_order_popup(self.add_order_menu_layout)
+
+    def enable_telemetry(self):
+        # Must run before build() so the buttons bind the wrapped methods.
+        telemetry = self.telemetry = Telemetry()
+        confirm_order = self.confirm_order
+
+        def tapped_confirm(*args):
+            if self.current_order is not None and self.current_order.lines:
+                self.tapped_order_id = self.current_order.order_id
+                telemetry.begin("tap_to_ticket")
+            return confirm_order(*args)
+
+        self.confirm_order = tapped_confirm
+        telemetry.instrument(
+            self,
+            "add_item_to_order",
+            "confirm_modifications",
+            "confirm_order",
+            "update_order",
+            "order_complete",
+        )
+
+    def start_telemetry(self, overlay=False, export=None):
+        from kivy.core.window import Window
+
+        telemetry = self.telemetry
+        # Ticket text arrives a frame or more after the rail update, so the
+        # tap ends when the confirmed ticket's texture is shown.
+        self.ticket_rail.on_ticket_shown = self.ticket_shown
+        Clock.schedule_interval(lambda dt: telemetry.record("frame", dt), 0)
+        if overlay:
+            self.telemetry_overlay = MDLabel(
+                text="",
+                font_style="Caption",
+                size_hint=(None, None),
+                size=(dp(420), dp(140)),
+                pos=(dp(10), dp(10)),
+                valign="bottom",
+            )
+            Window.add_widget(self.telemetry_overlay)
+            Clock.schedule_interval(self.update_telemetry_overlay, 0.5)
+        if export:
+            telemetry.start_exporter(export)
+
+    def ticket_shown(self, order_id):
+        if order_id == self.tapped_order_id:
+            self.tapped_order_id = None
+            self.telemetry.end("tap_to_ticket")
+
+    def update_telemetry_overlay(self, dt):
+        self.telemetry_overlay.text = self.telemetry.format()
+
+    def start_simulation(self, arrival_rate, speedup=60.0):
+        # Replays a rush through the real handlers so the rail and popups
+        # are exercised under load; speedup compresses kitchen time.
+        # Orders come off the app's own menu and skip greyed-out items.
+        simulation = self.simulation = Simulation(
+            AppTarget(self),
+            SimulationConfig(arrival_rate=arrival_rate),
+            menu=self.menu,
+            options=self.get_default_options(),
+            available=self.inventory.is_available,
+        )
+        started = Clock.get_time()
+
+        def step(dt):
+            simulation.advance((Clock.get_time() - started) * speedup)
+            return not simulation.finished
+
+        Clock.schedule_interval(step, 0)
+
+    def drain_order_bus(self, dt):
+        # A bounded batch per frame, so a burst from the other terminals
+        # can't hold up the Kivy clock.
+        for event in self.order_bus.drain(limit=100):
+            if event.kind == STATION_DONE:
+                order, finished = apply_station_done(self.engine, self.scheduler, event)
+                # Two stations finishing at once each hear the other; either
+                # may complete it, a second completion is a no-op.
+                if finished and self.station is not None:
+                    self.order_complete(order_id=order.order_id)
+                    continue
+            else:
+                order = apply_event(self.engine, self.menu, event)
+            if order is not None:
+                self.refresh.mark_dirty("rail", order)
+
     def open_modify_item_popup(self, burger):
+        if self.modify_item_popup is None or self.modify_item_popup_stale:
+            self.build_modify_item_popup()
+        ingredients = burger.ingredients
+        self.ensure_modify_item_rows(len(ingredients))
+
+        self.modify_burger = burger
+        self.ingredient_modifiers.clear()
+        self.option_modifiers.clear()
+        # Only attach/detach the rows whose visibility changes; rows keep
+        # their place and just get rebound.
+        for row in self.modify_item_rows[len(ingredients):]:
+            if row.parent is not None:
+                self.modify_rows_layout.remove_widget(row)
+        for ingredient, row in zip(ingredients, self.modify_item_rows):
+            row.ingredient_label.text = ingredient
+            row.toggle_group.name = ingredient
+            row.toggle_group.reset()
+            if row.parent is None:
+                # ingredient rows go above the fixed option rows
+                self.modify_rows_layout.add_widget(
+                    row, index=len(self.modify_option_rows)
+                )
+        for row in self.modify_option_rows.values():
+            row.toggle_group.reset()
+
+        self.modify_item_popup.title = "Modify " + burger.name
+        self.modify_item_popup.open()
+
+    def build_modify_item_popup(self):
+        # Built once; every open rebinds the pooled rows to the chosen item.
         layout = MDGridLayout(
             orientation="tb-lr", rows=2, padding=[10, 10, 10, 10], spacing=10
         )
-        inner_layout = MDGridLayout(
-            orientation="lr-tb", cols=4, padding=[10, 10, 10, 10], spacing=10
+        inner_layout = MDBoxLayout(
+            orientation="vertical", padding=[10, 10, 10, 10], spacing=10
         )
-        for ingredient in burger.ingredients:
-            ingredient_label, add_button, normal_button, remove_button = (
-                self.create_modify_item_row(ingredient)
-            )
-            inner_layout.add_widget(ingredient_label)
-            inner_layout.add_widget(remove_button)
-            inner_layout.add_widget(normal_button)
-            inner_layout.add_widget(add_button)
-            burger.button_states[ingredient] = {
-                "EXTRA": add_button,
-                "NORMAL": normal_button,
-                "NONE": remove_button,
-            }
+        self.modify_rows_layout = inner_layout
+
+        self.modify_item_rows = []
+        self.ensure_modify_item_rows(
+            max((len(item.ingredients) for item in self.menu.burgers), default=0)
+        )
+        self.modify_option_rows = {}
         for option in self.get_default_options():
+            toggle_group = ToggleGroup(option, self.option_modifiers)
             default_button, spacer, spacer2, option_button = (
-                self.create_default_options_row(option)
+                self.create_default_options_row(option, toggle_group)
             )
-            inner_layout.add_widget(default_button)
-            inner_layout.add_widget(option_button)
-            inner_layout.add_widget(spacer)
-            inner_layout.add_widget(spacer2)
-            burger.additional_options_button_states[option] = {
-                "OPTION": option_button,
-                "NONE": default_button,
-            }
+            row = MDGridLayout(orientation="lr-tb", cols=4, spacing=10)
+            row.add_widget(default_button)
+            row.add_widget(option_button)
+            row.add_widget(spacer)
+            row.add_widget(spacer2)
+            row.toggle_group = toggle_group
+            inner_layout.add_widget(row)
+            self.modify_option_rows[option] = row
 
         layout.add_widget(inner_layout)
         confirm_button = MDFlatButton(
@@ -312,86 +427,116 @@ class BurgerApp(MDApp):
             _no_ripple_effect=True,
             size_hint=(1, 0.1),
             line_color="white",
-            on_release=lambda x, burger=burger: self.confirm_modifications(
-                burger=burger
-            ),
+            on_release=lambda x: self.confirm_modifications(burger=self.modify_burger),
         )
         layout.add_widget(confirm_button)
+        self.modify_item_popup_stale = False
         self.modify_item_popup = Popup(
             content=layout,
             size_hint=(0.4, 0.8),
             separator_height=0,
 
-            title='Modify ' + burger.name,
+            title="",
             overlay_color=(0, 0, 0, 0),
         )
-        self.modify_item_popup.open()
+
+    def ensure_modify_item_rows(self, row_count):
+        for index in range(len(self.modify_item_rows), row_count):
+            toggle_group = ToggleGroup(f"row_{index}", self.ingredient_modifiers)
+            ingredient_label, add_button, normal_button, remove_button = (
+                self.create_modify_item_row("", toggle_group)
+            )
+            row = MDGridLayout(orientation="lr-tb", cols=4, spacing=10)
+            row.add_widget(ingredient_label)
+            row.add_widget(remove_button)
+            row.add_widget(normal_button)
+            row.add_widget(add_button)
+            row.ingredient_label = ingredient_label
+            row.toggle_group = toggle_group
+            self.modify_item_rows.append(row)
 
     def confirm_modifications(self, burger):
-        order_modifications = {}
-        additional_options = []
-        for ingredient, buttons in burger.button_states.items():
-            for modifier, button in buttons.items():
-                if button.is_selected:
-                    order_modifications[ingredient] = modifier
-                    button.state = "normal"
-                    break
-        for options, butts in burger.additional_options_button_states.items():
-            # print(options, butts)
-            for option, butt in butts.items():
-                # print(option,butt)
-                if butt.is_selected and option == "OPTION":
-                    burger.additional_options.append(options)
-
-        for ingredient, modifier in order_modifications.items():
+        added_ingredients = []
+        removed_ingredients = []
+        for ingredient, modifier in self.ingredient_modifiers.items():
             if modifier == "EXTRA":
-                burger.added_ingredients.append(ingredient)
+                added_ingredients.append(ingredient)
             elif modifier == "NONE":
-                burger.removed_ingredients.append(ingredient)
-        # for option in additional_options:
-        #     burger.additional_options.appe
+                removed_ingredients.append(ingredient)
+        additional_options = [
+            option
+            for option, modifier in self.option_modifiers.items()
+            if modifier == "OPTION"
+        ]
+
+        burger = burger.modified(
+            added=added_ingredients,
+            removed=removed_ingredients,
+            options=additional_options,
+        )
         self.add_item_to_order(burger)
         self.modify_item_popup.dismiss()
-        burger.button_states.clear()
-        burger.additional_options_button_states.clear()
+        self.modify_burger = None
+        self.ingredient_modifiers.clear()
+        self.option_modifiers.clear()
 
-    def create_modify_item_row(self, ingredient):
+    def create_modify_item_row(self, ingredient, toggle_group):
         ingredient_label = MDLabel(text=ingredient)
-        add_button = ToggleMDFlatButton(text="EXTRA", group=ingredient)
-        normal_button = ToggleMDFlatButton(text="NORMAL", group=ingredient)
-        remove_button = ToggleMDFlatButton(text="NONE", group=ingredient)
+        add_button = ToggleMDFlatButton(text="EXTRA", group=toggle_group)
+        normal_button = ToggleMDFlatButton(text="NORMAL", group=toggle_group)
+        remove_button = ToggleMDFlatButton(text="NONE", group=toggle_group)
         return ingredient_label, add_button, normal_button, remove_button
 
-    def create_default_options_row(self, option):
-        unique_group_name = f"option_{option}"
+    def create_default_options_row(self, option, toggle_group):
         default_button = ToggleMDFlatButton(
-            text="None", default_state="None", group=unique_group_name
+            text="None", default_state="None", value="NONE", group=toggle_group
         )
         spacer = MDBoxLayout(orientation="horizontal", size_hint_x=None, width=100)
         spacer2 = MDBoxLayout(orientation="horizontal")
         option_button = ToggleMDFlatButton(
-            text=option, default_state="None", group=unique_group_name
+            text=option, default_state="None", value="OPTION", group=toggle_group
         )
         return default_button, spacer, spacer2, option_button
 
     def open_add_order_popup(self):
+        if self.add_order_popup is None:
+            self.build_add_order_popup()
+        if self.add_order_popup_menu_version != self.menu.version:
+            self.add_inventory_to_order_popup(self.add_order_menu_layout)
+
+        self.name_text_input.text = ""
+        self.quantity_input.text = ""
+        self.update_order_total()
+        self.update_right_side_order_contents()
+        self.add_order_popup.open()
+
+    def build_add_order_popup(self):
         layout = MDGridLayout(
             orientation="tb-lr", rows=2, padding=[10, 10, 10, 10], spacing=10
         )
         inner_layout = MDGridLayout(
             orientation="lr-tb", cols=4, padding=[10, 10, 10, 10], spacing=10
         )
+        # Grows a row per menu item and scrolls once the menu outgrows it.
         left_layout = MDGridLayout(
-            orientation="lr-tb", rows=10, cols=3, padding=[10, 10, 10, 10], spacing=10
+            orientation="lr-tb",
+            cols=3,
+            padding=[10, 10, 10, 10],
+            spacing=10,
+            adaptive_height=True,
         )
-        self.add_inventory_to_order_popup(left_layout)
+        self.add_order_menu_layout = left_layout
+        self.add_order_menu_rows = {}
+        self.add_order_popup_menu_version = None
 
-        inner_layout.add_widget(left_layout)
+        menu_scroll = ScrollView(do_scroll_x=False)
+        menu_scroll.add_widget(left_layout)
+        inner_layout.add_widget(menu_scroll)
 
-        right_layout = MDGridLayout(
-            orientation="tb-lr", rows=10, cols=2, padding=[10, 10, 10, 10], spacing=10
+        # Scrolls and only builds the rows on screen, for catering-size orders.
+        right_layout = self.order_summary = OrderSummary(
+            on_quantity=self.set_line_quantity, prerenderer=self.text_prerenderer
         )
-        self.populate_order_popup_right_layout(right_layout)
 
         separator = MDBoxLayout(orientation='vertical', size_hint_x=None, width=5, md_bg_color='blue', size_hint_y=1)
         inner_layout.add_widget(separator)
@@ -399,9 +544,15 @@ class BurgerApp(MDApp):
 
         layout.add_widget(inner_layout)
 
-        button_layout = MDGridLayout(orientation="lr-tb", cols=2, size_hint_y=0.1)
+        button_layout = MDGridLayout(orientation="lr-tb", cols=4, size_hint_y=0.1)
 
-        self.name_text_input = TextInput()
+        self.name_text_input = TextInput(hint_text="Customer name", multiline=False)
+        button_layout.add_widget(self.name_text_input)
+        # Quantity for the next Add / Modify; blank means one.
+        self.quantity_input = TextInput(
+            hint_text="Qty", input_filter="int", multiline=False, size_hint_x=0.4
+        )
+        button_layout.add_widget(self.quantity_input)
 
         button = MDFlatButton(
             text="Confirm", line_color="white", on_release=self.confirm_order, size_hint=(1,1)
@@ -419,273 +570,582 @@ class BurgerApp(MDApp):
             size_hint=(0.4, 0.8),
 
         )
-        self.add_order_popup.open()
 
     def add_inventory_to_order_popup(self, layout):
+        # One row per menu item, kept by item id: rows of items that left the
+        # menu are dropped, new items get rows, unchanged items keep theirs.
+        rows = self.add_order_menu_rows
+        current = {burger.item_id for burger in self.menu.burgers}
+        for item_id in [item_id for item_id in rows if item_id not in current]:
+            for widget in rows.pop(item_id):
+                layout.remove_widget(widget)
+
+        wanted = [burger.item_id for burger in self.menu.burgers]
+        if wanted[: len(rows)] != list(rows):
+            layout.clear_widgets()
+            rows = self.add_order_menu_rows = {
+                item_id: rows[item_id] for item_id in wanted if item_id in rows
+            }
+            for widgets in rows.values():
+                for widget in widgets:
+                    layout.add_widget(widget)
         for burger in self.menu.burgers:
-            layout.add_widget(
-                MDLabel(
-                    text=f"{burger.name}  ${burger.price}",
-                    adaptive_height=False,
-                    size_hint_y=None,
-                    height=60,
-                )
-            )
-            layout.add_widget(
-                MDFlatButton(
-                    text="Add",
-                    _min_height=60,
-                    line_color="white",
-                    on_release=lambda x, burger=burger: self.add_item_to_order(
-                        burger.clone()
-                    ),
-                )
-            )
-            layout.add_widget(
-                MDFlatButton(
-                    text="Modify",
-                    _min_height=60,
-                    line_color="white",
-                    on_release=lambda x, burger=burger: self.open_modify_item_popup(
-                        burger.clone()
-                    ),
-                )
-            )
+            if burger.item_id not in rows:
+                rows[burger.item_id] = self.create_menu_row(burger)
+                for widget in rows[burger.item_id]:
+                    layout.add_widget(widget)
+        self.add_order_popup_menu_version = self.menu.version
+
+    def create_menu_row(self, burger):
+        label = MDLabel(
+            text=f"{burger.name}  ${burger.price}",
+            adaptive_height=False,
+            size_hint_y=None,
+            height=60,
+        )
+        add_button = MDFlatButton(
+            text="Add",
+            _min_height=60,
+            line_color="white",
+            on_release=lambda x, burger=burger: self.add_item_to_order(
+                burger.clone()
+            ),
+        )
+        modify_button = MDFlatButton(
+            text="Modify",
+            _min_height=60,
+            line_color="white",
+            on_release=lambda x, burger=burger: self.open_modify_item_popup(
+                burger.clone()
+            ),
+        )
+        row = label, add_button, modify_button
+        self.set_row_available(row, self.inventory.is_available(burger))
+        return row
+
+    def update_item_availability(self, item_ids, available):
+        if self.add_order_popup is None:
+            return
+        for item_id in item_ids:
+            row = self.add_order_menu_rows.get(item_id)
+            if row is not None:
+                self.set_row_available(row, available)
+
+    def set_row_available(self, row, available):
+        label, add_button, modify_button = row
+        label.opacity = 1 if available else 0.4
+        add_button.disabled = not available
+        modify_button.disabled = not available
 
     def add_item_to_order(self, burger: Burger):
-
-        if self.current_order is None:
-            self.current_order = Order(order_id=str(uuid.uuid4()))
-        self.current_order.add_burger(burger)
-        self.order_total.text = str(self.current_order.total_price())
-        self.update_right_side_order_contents()
+        self.engine.add_item_to_order(burger, self.take_quantity())
+        self.refresh.mark_dirty("total")
+        self.refresh.mark_dirty("summary")
+
+    def take_quantity(self):
+        # The quantity box applies to one Add / Modify, then clears.
+        if self.add_order_popup is None or not self.quantity_input.text:
+            return 1
+        try:
+            quantity = int(self.quantity_input.text)
+        except ValueError:
+            quantity = 1
+        self.quantity_input.text = ""
+        return max(quantity, 1)
+
+    def set_line_quantity(self, burger, quantity):
+        if self.engine.set_quantity(burger, max(quantity, 0)) is not None:
+            self.refresh.mark_dirty("total")
+            self.refresh.mark_dirty("summary")
+
+    def update_order_total(self):
+        order = self.current_order
+        self.order_total.text = "" if order is None else str(order.total_price())
 
     def update_right_side_order_contents(self):
-        self.clear_right_side_widgets()
-
-        identical_burgers = self.current_order.count_identical_burgers()
-
-        display_info = []
-        for burger, count in identical_burgers.items():
-            name = burger.name
-            single_item_price = burger.price
-            price = single_item_price * count
-            # ingredient_info = ''
-            ingredient_info = []
-
-            if burger.removed_ingredients:
-                ingredient_info.append("No " + ", ".join(burger.removed_ingredients))
-
-            if burger.added_ingredients:
-                ingredient_info.append("Add: " + ", ".join(burger.added_ingredients))
-
-            if burger.additional_options:
-                ingredient_info.append("" + ", ".join(burger.additional_options))
-
-            # if ingredient_info:
-            ingredient_info_str = " | ".join(ingredient_info) if ingredient_info else ''
-            display_info.append((name, single_item_price, count, price, ingredient_info_str))
-
-        for index, (name, single_item_price, count, price, ingredient_info_str) in enumerate(
-            display_info, start=1
-        ):
-            item_attr = getattr(self, f"item_{index}", None)
-            if item_attr:
-                item_attr.text = f"{count}x {name} {price}\n{ingredient_info_str}"
-
-
-    def clear_right_side_widgets(self):
-        for i in range(1, 11):  # Magic numbers yo
-            item_attr = getattr(self, f"item_{i}", None)
-            if item_attr:
-                item_attr.text = ""
+        if self.add_order_popup is None:
+            return
+        order = self.current_order
+        self.order_summary.set_rows(
+            [] if order is None else self.renderer.summary_rows(order)
+        )
 
     def confirm_order(self, _):
-        # print("\ninside confirm_order")
-        # for order in self.orders:
-        #     if order['order_id'] == self.order_id:
-        self.existing_orders.append(self.current_order)
-        self.current_order = None  # reset current order when we close the order menu
         customer_name = self.name_text_input.text or None
-        if customer_name is not None:
-            self.current_order.customer_name == customer_name
-
-        self.update_order()
+        order = self.engine.confirm_order(customer_name)
+        if order is not None:
+            self.refresh.mark_dirty("rail", order)
         self.add_order_popup.dismiss()
 
     def get_order_instance(self, order_id):
-        return Order(order_id)
-
-    def update_order_widget(self, order_widget, order_button, order_instance):
-        order_string = self.construct_order_display(order_instance)
-        order_widget.text = order_string
-        order_button.text = "Order Complete"
-        order_button.line_color = "white"
-        order_button.on_release = (
-            lambda order_id=order_instance.order_id: self.order_complete(
-                order_id=order_id
-            )
-        )
+        return self.existing_orders.get(order_id)
 
     def construct_order_display(self, order_instance):
-        order_string = ""
-        identical_burgers = order_instance.count_identical_burgers()
-        for burger, count in identical_burgers.items():  # COLOR
-            order_string += f"[color=#ffea2e]\n{burger.name}[/color] x{count}\n[size=14]{self.get_ingredient_modifications(burger)}\n{self.get_additional_options(burger)}[/size]\n"
-        return order_string
+        return self.renderer.construct_order_display(order_instance)
 
     def get_additional_options(self, burger):
-        additional_options =[]
-        if burger.additional_options:
-            for option in burger.additional_options:
-                additional_options.append(f'[color=00ff00]ADD {option}[/color]')
-        return "\n".join(additional_options)
+        return self.renderer.get_additional_options(burger)
 
     def get_ingredient_modifications(self, burger):
-        add_items, remove_items = burger.display_modifications()
-        modified_ingredients = []
-        for entry in self.menu.burgers:
-            if entry.name == burger.name:
-                for ing in entry.ingredients:
-                    if ing in remove_items:
-                        modified_ingredients.append(f"[color=ff0000]NO {ing}[/color]")
-                    elif ing in add_items:
-                        modified_ingredients.append(
-                            f"[color=00ff00]EXTRA {ing}[/color]"
-                        )
-                    else:
-                        modified_ingredients.append(ing)
-        return "\n".join(modified_ingredients)
-
-    def update_order(self):
-        for index, order in enumerate(self.existing_orders, start=1):
-            order_id = order.order_id
-            order_instance = self.get_order_instance(order_id)
-            order_widget_attr = getattr(self, f"order_{index}", None)
-            order_button_attr = getattr(self, f"order_{index}_button", None)
-
-            if order_widget_attr and order_button_attr:
-                self.update_order_widget(
-                    order_widget_attr, order_button_attr, order_instance
-                )
-            else:
-                break
-        self.clean_completed_orders()
-
-    def clean_completed_orders(self):
-        num_orders = len(self.existing_orders)
-        total_widgets = (
-            len(
-                [
-                    attr
-                    for attr in dir(self)
-                    if "order_" in attr and not "_button" in attr
-                ]
+        return self.renderer.get_ingredient_modifications(burger)
+
+    def refresh_rail(self, orders):
+        if orders is None:
+            self.update_order()
+        elif self.station is not None:
+            # A station rail is rebuilt whole, so once for the batch.
+            for order in orders:
+                self.update_kitchen(order)
+            self.ticket_rail.set_tickets(self.station_tickets())
+        else:
+            for order in orders:
+                self.update_order(order)
+
+    def update_kitchen(self, order=None):
+        if order is None:
+            for existing_order in self.existing_orders.values():
+                self.scheduler.update(existing_order)
+        elif order.order_id in self.existing_orders:
+            self.scheduler.update(order)
+        else:
+            self.scheduler.remove(order.order_id)
+
+    def update_order(self, order=None):
+        # With an order, only that ticket's slot is inserted, rewritten or
+        # removed; without one the whole rail is resynced.
+        self.update_kitchen(order)
+        if self.station is not None:
+            self.ticket_rail.set_tickets(self.station_tickets())
+        elif order is None:
+            self.ticket_rail.set_tickets(
+                (order.order_id, self.construct_order_display(order))
+                for order in self.existing_orders.values()
+            )
+        elif order.order_id in self.existing_orders:
+            self.ticket_rail.put_ticket(
+                order.order_id, self.construct_order_display(order)
             )
-            // 2
-        )
-        if num_orders < total_widgets:
-            for extra_index in range(num_orders + 1, total_widgets + 1):
-                extra_order_widget = getattr(self, f"order_{extra_index}", None)
-                extra_order_button = getattr(self, f"order_{extra_index}_button", None)
-                if extra_order_widget and extra_order_button:
-                    extra_order_widget.text = ""
-                    extra_order_button.line_color = [0, 0, 0, 0]
-                    extra_order_button.text = ""
-                    extra_order_button.on_release = self.do_nothing
+        else:
+            self.ticket_rail.remove_ticket(order.order_id)
 
     def reset_order_id(self):
         pass
 
-    def order_complete(self, order_id=None):
-        self.current_order = None
-        for order in self.existing_orders:
+    def station_tickets(self):
+        for order_id, lines in self.scheduler.station_tickets(
+            self.station, self.station_lines
+        ).items():
+            yield order_id, "".join(
+                self.renderer.render_order_line(line.burger, line.count)
+                for line in lines
+            )
 
-            if order.order_id == order_id:
-                self.existing_orders.remove(order)
-                self.update_order()
+    def ticket_complete(self, order_id=None):
+        # At a station, done only clears that station's lines; the order
+        # completes once no station has anything left for it. Other station
+        # displays are on the bus, so they hear which lines are done.
+        if self.station is not None and not self.scheduler.finish(order_id, self.station):
+            if self.bus_publisher is not None:
+                self.bus_publisher.station_done(order_id, self.station)
+            self.refresh.mark_dirty("rail", self.get_order_instance(order_id))
+            return
+        self.order_complete(order_id=order_id)
 
-    def populate_order_popup_right_layout(self, layout):
-        for i in range(1, 11):
-            setattr(self, f"item_{i}", MDLabel(text=""))
-            layout.add_widget(getattr(self, f"item_{i}"))
+    def order_complete(self, order_id=None):
+        self.engine.discard_current_order()
+        order = self.engine.order_complete(order_id)
+        if order is not None:
+            self.refresh.mark_dirty("rail", order)
 
     def get_default_options(self):
-
-        default_options = ["Gluten Free Bun", "Vegan", "Plain"]
-        return default_options
+        return list(self.menu.options)
 
     def populate_menu(self):
-        menu = Menu()
-        burgers_data = [
-            (
-                "The Revolt (Single)",
-                12.00,
-                ["Two Patties", "Rebel Sauce", "One Cheese", "Arugula", "Roma Tomato"],
-            ),
-            (
-                "The Revolt (Double)",
-                14.00,
-                ["Two Patties", "Rebel Sauce", "Two Cheese", "Arugula", "Roma Tomato"],
-            ),
-            (
-                "The Hexxor",
-                14.00,
-                [
-                    "Two Patties",
-                    "Avocado Bacon Sauce",
-                    "Cheese",
-                    "Arugula",
-                    "Red Onion",
-                ],
-            ),
-            ("The Sham-moo", 14.00, ["Vegan Patty", "Tomato Pesto", "Arugula"]),
-            ("Hot Texan", 5.00, ["Hot dog", "Chili Sauce", "Mustard", "Onion"]),
-        ]
-        for name, price, ingredients in burgers_data:
-            burger = Burger(name, price, ingredients)
-            menu.add_burger(burger)
+        if self.menu_file is not None:
+            menu, _ = self.menu_file.load()
+            return menu
+        return populate_menu()
+
+
+class ToggleGroup:
+    # Remembers which member is selected, so switching touches two buttons
+    # instead of every sibling, and mirrors the selected value into a shared
+    # dict keyed by the group name.
+    def __init__(self, name, selections):
+        self.name = name
+        self.selections = selections
+        self.default = None
+        self.selected = None
+
+    def add(self, button):
+        if button.text == button.default_state:
+            self.default = button
+            self.select(button)
+        else:
+            button.set_selected(False)
+
+    def select(self, button):
+        if self.selected is not button:
+            if self.selected is not None:
+                self.selected.set_selected(False)
+            self.selected = button
+            button.set_selected(True)
+        self.selections[self.name] = button.value
 
-        return menu
+    def reset(self):
+        if self.default is not None:
+            self.select(self.default)
 
 
 class ToggleMDFlatButton(MDFlatButton):
     selected_color = StringProperty("white")
     normal_color = ListProperty([0, 0, 0, 1])
-    group = StringProperty(None)
+    group = ObjectProperty(None, allownone=True)
     default_state = StringProperty()
+    value = StringProperty()
     is_selected = BooleanProperty(False)
 
-    def __init__(self, default_state="NORMAL", **kwargs):
+    def __init__(self, default_state="NORMAL", value=None, **kwargs):
         self.default_state = default_state
         super().__init__(**kwargs)
+        self.value = self.text if value is None else value
         self.theme_text_color = "Custom"
         self._no_ripple_effect = True
 
-        if self.text == self.default_state:
+        if self.group is None:
+            self.reset()
+        else:
+            self.group.add(self)
+
+    def reset(self):
+        self.set_selected(self.text == self.default_state)
+
+    def set_selected(self, selected):
+        if selected:
             self.md_bg_color = [1, 1, 1, 1]  # white
             self.text_color = [0, 0, 0, 1]  # black
-            self.is_selected = True
+            self.opacity = 1
         else:
             self.md_bg_color = [0, 0, 0, 1]
             self.text_color = [1, 1, 1, 1]
             self.opacity = 0.2
+        self.is_selected = selected
 
     def on_release(self, *args):
         super().on_release()
-        parent = self.parent
-        for child in parent.children:
-            if isinstance(child, ToggleMDFlatButton) and child.group == self.group:
-                if child != self:
-                    child.md_bg_color = [0, 0, 0, 1]
-                    child.text_color = [1, 1, 1, 1]
-                    child.opacity = 0.2
-                    child.is_selected = False
-                else:
-                    child.md_bg_color = [1, 1, 1, 1]
-                    child.text_color = [0, 0, 0, 1]
-                    child.opacity = 1
-                    child.is_selected = True
+        if self.group is not None:
+            self.group.select(self)
+
+
+# Off-thread rendering drives MarkupLabel by hand the way LabelBase.refresh()
+# does in Kivy 2.x, through its internals (resolve_font_name, _size,
+# _size_texture and render() blitting into label.texture). On any other major
+# version, or if it ever fails, text is rendered on the main thread instead.
+OFF_THREAD_TEXT = kivy.__version__.split(".")[0] == "2"
+
+
+class TextCapture:
+    # Stands in for a label's texture so a core label rendered off the main
+    # thread hands over its pixels instead of touching GL.
+    data = None
+
+    def blit_data(self, data):
+        self.data = data
+
+
+class TextPrerenderer:
+    # Ticket and summary markup is laid out and rasterised by a worker with
+    # Kivy's core markup label; the main thread only uploads the pixels into
+    # a Texture. Textures are cached by content (text plus render options),
+    # so a ticket that comes back, or the same line on many tickets, is
+    # drawn once.
+    def __init__(self, max_textures=512):
+        self.max_textures = max_textures
+        self.off_thread = OFF_THREAD_TEXT
+        self.textures = OrderedDict()
+        self.waiting = {}
+        self.requests = queue.Queue()
+        self.results = deque()
+        self.upload_trigger = Clock.create_trigger(self.upload, -1)
+        self.thread = threading.Thread(target=self._render_loop, name="text", daemon=True)
+
+    def start(self):
+        if self.off_thread:
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.requests.put(None)
+
+    def request(self, text, options, callback):
+        key = (text, options)
+        texture = self.textures.get(key)
+        if texture is not None:
+            self.textures.move_to_end(key)
+            callback(texture)
+            return
+        if key in self.waiting:
+            self.waiting[key].append(callback)
+            return
+        self.waiting[key] = [callback]
+        if self.off_thread:
+            self.requests.put(key)
+        else:
+            self.results.append((key, None, True))
+            self.upload_trigger()
+
+    @staticmethod
+    def core_label(key):
+        text, (font_name, font_size, width, color) = key
+        return CoreMarkupLabel(
+            text=text,
+            font_name=font_name,
+            font_size=font_size,
+            text_size=(width, None),
+            color=color,
+            markup=True,
+        )
+
+    def _render_loop(self):
+        while True:
+            key = self.requests.get()
+            if key is None:
+                return
+            try:
+                label = self.core_label(key)
+                label.resolve_font_name()
+                label._size = label._size_texture = label.render()
+                capture = label.texture = TextCapture()
+                if label._size[0] > 1 and label._size[1] > 1:
+                    label.render(real=True)
+                    if capture.data is None:
+                        raise RuntimeError("the label rendered nothing into the capture")
+                self.results.append((key, capture.data, False))
+            except Exception:
+                Logger.exception("Text: off-thread rendering failed, rendering on the main thread")
+                self.off_thread = False
+                self.results.append((key, None, True))
+            self.upload_trigger()
+
+    def render_now(self, key):
+        # The public, main-thread path: refresh() lays out, rasterises and
+        # uploads in one go.
+        label = self.core_label(key)
+        label.refresh()
+        texture = label.texture
+        return texture if texture.width > 1 and texture.height > 1 else None
+
+    def upload(self, *args):
+        while self.results:
+            key, data, fallback = self.results.popleft()
+            texture = None
+            if fallback:
+                texture = self.render_now(key)
+            elif data is not None:
+                texture = Texture.create(size=(data.width, data.height), colorfmt=data.fmt)
+                texture.blit_data(data)
+                texture.flip_vertical()
+            if texture is not None:
+                self.textures[key] = texture
+                if len(self.textures) > self.max_textures:
+                    self.textures.popitem(last=False)
+            for callback in self.waiting.pop(key, ()):
+                callback(texture)
+
+
+class PrerenderedLabel(Widget):
+    # Shows text through TextPrerenderer: setting text asks for the texture
+    # and draws it top-left inside the padding once it arrives.
+    text = StringProperty("")
+    texture = ObjectProperty(None, allownone=True)
+
+    def __init__(self, font_name="Roboto", font_size=sp(16), text_width=None, padding=0, **kwargs):
+        super().__init__(**kwargs)
+        self.prerenderer = None
+        self.shown = None
+        self.options = (font_name, font_size, text_width, (1, 1, 1, 1))
+        self.padding = padding
+        with self.canvas:
+            Color(1, 1, 1, 1)
+            self.rect = Rectangle(size=(0, 0))
+        self.bind(pos=self.place, size=self.place, texture=self.place)
+
+    def on_text(self, instance, text):
+        self.texture = None
+        if text and self.prerenderer is not None:
+            self.prerenderer.request(text, self.options, lambda texture: self.show(text, texture))
+
+    def show(self, text, texture):
+        # A recycled view may have moved on to other text meanwhile.
+        if text == self.text:
+            self.texture = texture
+            if texture is not None and self.shown is not None:
+                self.shown()
+
+    def place(self, *args):
+        texture = self.texture
+        self.rect.texture = texture
+        if texture is None:
+            self.rect.size = (0, 0)
+            return
+        self.rect.size = texture.size
+        self.rect.pos = (
+            self.x + self.padding,
+            self.top - self.padding - texture.height,
+        )
+
+
+class SummaryLineView(RecycleDataViewBehavior, MDBoxLayout):
+    text = StringProperty("")
+    count = NumericProperty(0)
+    burger = ObjectProperty(None, allownone=True)
+
+    def __init__(self, **kwargs):
+        super().__init__(orientation="horizontal", spacing=5, **kwargs)
+        self.summary = None
+        self.line_label = PrerenderedLabel(font_size=sp(16), padding=dp(8))
+        self.add_widget(self.line_label)
+        self.add_widget(
+            MDIconButton(
+                icon="minus",
+                on_release=lambda x: self.summary.on_quantity(self.burger, self.count - 1),
+            )
+        )
+        self.add_widget(
+            MDIconButton(
+                icon="plus",
+                on_release=lambda x: self.summary.on_quantity(self.burger, self.count + 1),
+            )
+        )
+        self.bind(text=self.line_label.setter("text"))
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.summary = rv
+        self.line_label.prerenderer = rv.prerenderer
+        return super().refresh_view_attrs(rv, index, data)
+
+
+class OrderSummary(RecycleView):
+    # The order being built, one row per distinct line with -/+ to edit its
+    # quantity in place.
+    def __init__(self, on_quantity, prerenderer=None, line_height=dp(64), **kwargs):
+        super().__init__(do_scroll_x=False, bar_width=dp(6), **kwargs)
+        self.on_quantity = on_quantity
+        self.prerenderer = prerenderer
+        self.line_layout = RecycleBoxLayout(
+            orientation="vertical",
+            default_size=(None, line_height),
+            default_size_hint=(1, None),
+            size_hint=(1, None),
+            spacing=5,
+        )
+        self.line_layout.bind(minimum_height=self.line_layout.setter("height"))
+        self.add_widget(self.line_layout)
+        self.viewclass = SummaryLineView
+
+    def set_rows(self, rows):
+        self.data = rows
+
+
+class TicketView(RecycleDataViewBehavior, MDBoxLayout):
+    order_id = StringProperty("")
+    text = StringProperty("")
+
+    def __init__(self, ticket_width=dp(320), **kwargs):
+        super().__init__(orientation="vertical", spacing=10, **kwargs)
+        self.rail = None
+        self.order_label = PrerenderedLabel(
+            font_size=sp(20),
+            text_width=ticket_width - 100,
+            padding=50,
+            size_hint_y=0.9,
+        )
+        self.complete_button = MDFlatButton(
+            text="Order Complete",
+            line_color="white",
+            on_release=lambda x: self.rail.complete_ticket(self.order_id),
+            _no_ripple_effect=True,
+            size_hint=(1, None),
+            _min_width=200,
+            _min_height=75,
+        )
+        self.add_widget(self.order_label)
+        self.add_widget(self.complete_button)
+        self.order_label.shown = self.ticket_shown
+        self.bind(text=self.order_label.setter("text"))
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.rail = rv
+        self.order_label.prerenderer = rv.prerenderer
+        return super().refresh_view_attrs(rv, index, data)
+
+    def ticket_shown(self):
+        if self.rail is not None and self.rail.on_ticket_shown is not None:
+            self.rail.on_ticket_shown(self.order_id)
+
+
+class TicketRail(RecycleView):
+    # The rail is a horizontal RecycleView: data holds one dict per open
+    # ticket and only the TicketViews that fit on screen are ever created.
+    def __init__(self, on_ticket_complete, prerenderer=None, ticket_width=dp(320), **kwargs):
+        super().__init__(
+            do_scroll_x=True,
+            do_scroll_y=False,
+            bar_width=dp(6),
+            scroll_type=["bars", "content"],
+            **kwargs,
+        )
+        self.on_ticket_complete = on_ticket_complete
+        self.on_ticket_shown = None
+        self.prerenderer = prerenderer
+        self.slots = {}
+        self.ticket_layout = RecycleBoxLayout(
+            orientation="horizontal",
+            default_size=(ticket_width, None),
+            default_size_hint=(None, 1),
+            size_hint=(None, 1),
+            padding=[10, 10, 10, 10],
+            spacing=10,
+        )
+        self.ticket_layout.bind(minimum_width=self.ticket_layout.setter("width"))
+        self.add_widget(self.ticket_layout)
+        self.viewclass = TicketView
+
+    def set_tickets(self, tickets):
+        data = [{"order_id": order_id, "text": text} for order_id, text in tickets]
+        # A station rail is resynced on every change; an unchanged one is
+        # left alone rather than relaid out.
+        if data == self.data:
+            return
+        self.slots = {entry["order_id"]: index for index, entry in enumerate(data)}
+        self.data = data
+
+    def put_ticket(self, order_id, text):
+        index = self.slots.get(order_id)
+        if index is None:
+            self.slots[order_id] = len(self.data)
+            self.data.append({"order_id": order_id, "text": text})
+        elif self.data[index]["text"] != text:
+            self.data[index] = {"order_id": order_id, "text": text}
+
+    def remove_ticket(self, order_id):
+        index = self.slots.pop(order_id, None)
+        if index is None:
+            return
+        del self.data[index]
+        # tickets to the right of the removed one shift down a slot
+        for entry in self.data[index:]:
+            self.slots[entry["order_id"]] -= 1
+
+    def complete_ticket(self, order_id):
+        self.on_ticket_complete(order_id=order_id)
+
+    def page(self, direction):
+        hidden_width = self.ticket_layout.width - self.width
+        if hidden_width <= 0:
+            return
+        step = self.width / hidden_width
+        self.scroll_x = min(1, max(0, self.scroll_x + direction * step))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,11 @@
+import pytest
+
+from burger import Order
+
+
+@pytest.fixture(autouse=True)
+def clear_order_registry():
+    # Order ids resolve through one process-wide registry; keep tests apart.
+    Order.registry.clear()
+    yield
+    Order.registry.clear()
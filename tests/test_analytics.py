@@ -0,0 +1,57 @@
+from burger import OrderEngine, populate_menu
+from burger.analytics import SalesStore
+from burger.history import OrderHistory
+
+
+def shift(tmp_path):
+    menu = populate_menu()
+    engine = OrderEngine()
+    history = OrderHistory(str(tmp_path / "history.sqlite3")).open()
+    sales = SalesStore()
+    engine.add_listener(history)
+    engine.add_listener(sales)
+    return menu, engine, history, sales
+
+
+def complete_orders(engine, menu, count):
+    for index in range(count):
+        burger = menu.burgers[index % len(menu.burgers)].clone().modified(options=["Vegan"])
+        engine.add_item_to_order(burger, index % 3 + 1)
+        order = engine.confirm_order(f"guest {index}")
+        engine.order_complete(order.order_id)
+
+
+def test_sales_since_the_last_save_are_replayed_from_history(tmp_path):
+    path = str(tmp_path / "sales.pickle")
+    menu, engine, history, sales = shift(tmp_path)
+    complete_orders(engine, menu, 3)
+    sales.save(path)
+    complete_orders(engine, menu, 4)
+    history.flush()
+
+    # Crashed before the store was saved again.
+    restored = SalesStore.load(path)
+    assert len(restored) == 3
+    assert restored.catch_up(history, menu) == 4
+    assert len(restored) == 7
+    assert list(restored.orders["total_cents"]) == list(sales.orders["total_cents"])
+    assert list(restored.lines["cents"]) == list(sales.lines["cents"])
+    assert list(restored.lines["options_mask"]) == list(sales.lines["options_mask"])
+    assert restored.catch_up(history, menu) == 0
+    history.close()
+
+
+def test_an_unreadable_store_is_rebuilt_from_history(tmp_path):
+    path = tmp_path / "sales.pickle"
+    menu, engine, history, sales = shift(tmp_path)
+    complete_orders(engine, menu, 5)
+    history.flush()
+    sales.save(str(path))
+    path.write_bytes(path.read_bytes()[:40])
+
+    restored = SalesStore.load(str(path))
+    assert len(restored) == 0
+    restored.catch_up(history, menu)
+    assert list(restored.orders["total_cents"]) == list(sales.orders["total_cents"])
+    assert SalesStore.load(str(tmp_path / "missing.pickle")).items == []
+    history.close()
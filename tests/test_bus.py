@@ -0,0 +1,184 @@
+import asyncio
+import json
+import socket
+import time
+
+import pytest
+
+from burger import DEFAULT_MENU, Order, OrderEngine, populate_menu
+from burger.bus import (
+    ORDER_COMPLETED,
+    ORDER_CREATED,
+    BusFull,
+    BusPublisher,
+    OrderBroker,
+    OrderBusClient,
+    OrderBusThread,
+    OrderEvent,
+    apply_event,
+)
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        await asyncio.sleep(0.005)
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def test_events_round_trip_between_terminals():
+    menu = populate_menu()
+
+    async def run():
+        broker = await OrderBroker().start()
+        received = []
+        counter = await OrderBusClient("127.0.0.1", broker.port).connect()
+        kitchen = await OrderBusClient(
+            "127.0.0.1", broker.port, on_events=received.extend
+        ).connect()
+        engine = OrderEngine()
+        engine.add_listener(BusPublisher(counter))
+        burger = menu.burgers[0].clone().modified(removed=["Arugula"], options=["Vegan"])
+        engine.add_item_to_order(burger, 2)
+        order = engine.confirm_order("Ada")
+        engine.order_complete(order.order_id)
+        await wait_for(lambda: len(received) == 2)
+        await counter.close()
+        await kitchen.close()
+        await broker.close()
+        return order.order_id, received
+
+    order_id, received = asyncio.run(run())
+    assert [event.kind for event in received] == [ORDER_CREATED, ORDER_COMPLETED]
+
+    Order.registry.clear()
+    engine = OrderEngine()
+    order = apply_event(engine, menu, received[0])
+    assert order.customer_name == "Ada"
+    [(burger, count)] = order.lines.items()
+    assert count == 2
+    assert burger.removed_ingredients == ["Arugula"]
+    assert burger.additional_options == ["Vegan"]
+    apply_event(engine, menu, received[1])
+    assert order_id not in engine.existing_orders
+
+
+def test_full_outbox_raises_bus_full():
+    async def run():
+        broker = await OrderBroker().start()
+        client = await OrderBusClient("127.0.0.1", broker.port, queue_size=4).connect()
+        for _ in range(4):
+            client.publish(OrderEvent(ORDER_COMPLETED, "order"))
+        with pytest.raises(BusFull):
+            client.publish(OrderEvent(ORDER_COMPLETED, "order"))
+        assert await client.flush(timeout=5)
+        client.publish(OrderEvent(ORDER_COMPLETED, "order"))
+        await client.close()
+        await broker.close()
+
+    asyncio.run(run())
+
+
+def test_broker_drops_a_terminal_that_stops_reading():
+    lines = tuple(([f"item {index}", 0, 0, []], 1, 100) for index in range(500))
+
+    async def run():
+        broker = await OrderBroker(queue_size=1, stall_timeout=0.2).start()
+        stalled_socket = socket.socket()
+        stalled_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        stalled_socket.connect(("127.0.0.1", broker.port))
+        _, stalled = await asyncio.open_connection(sock=stalled_socket)
+        sender = await OrderBusClient("127.0.0.1", broker.port).connect()
+        await wait_for(lambda: len(broker.connections) == 2)
+        for index in range(1500):
+            sender.publish(OrderEvent(ORDER_CREATED, str(index), lines=lines))
+            await asyncio.sleep(0)
+        await wait_for(lambda: len(broker.connections) == 1)
+        assert await sender.flush(timeout=5)
+        stalled.close()
+        await sender.close()
+        await broker.close()
+
+    asyncio.run(run())
+
+
+def test_terminals_rejoin_after_a_broker_restart():
+    async def run():
+        broker = await OrderBroker().start()
+        port = broker.port
+        received = []
+        counter = await OrderBusClient("127.0.0.1", port, reconnect_delay=0.5).connect()
+        kitchen = await OrderBusClient(
+            "127.0.0.1", port, on_events=received.extend, reconnect_delay=0.01
+        ).connect()
+        await broker.close()
+        await wait_for(lambda: not counter.connected and not kitchen.connected)
+
+        # Published while the broker is down: held, then sent on reconnect.
+        counter.publish(OrderEvent(ORDER_COMPLETED, "during outage"))
+        broker = await OrderBroker(port=port).start()
+        await wait_for(lambda: kitchen.connected)
+        assert await counter.flush(timeout=5)
+        counter.publish(OrderEvent(ORDER_COMPLETED, "after restart"))
+        await wait_for(lambda: len(received) == 2)
+        assert [event.order_id for event in received] == ["during outage", "after restart"]
+        assert counter.connections == kitchen.connections == 2
+        await counter.close()
+        await kitchen.close()
+        await broker.close()
+
+    asyncio.run(run())
+
+
+def test_thread_starts_degraded_and_joins_when_the_broker_appears():
+    port = free_port()
+    bus = OrderBusThread("127.0.0.1", port, reconnect_delay=0.02).start()
+    try:
+        assert not bus.connected
+        bus.publish(OrderEvent(ORDER_COMPLETED, "queued"))
+
+        async def run():
+            broker = await OrderBroker(port=port).start()
+            received = []
+            kitchen = await OrderBusClient(
+                "127.0.0.1", port, on_events=received.extend
+            ).connect()
+            await wait_for(lambda: received)
+            await kitchen.close()
+            await broker.close()
+            return received
+
+        received = asyncio.run(run())
+        assert received[0].order_id == "queued"
+    finally:
+        bus.stop()
+
+
+def test_received_orders_keep_prices_and_confirm_time_and_skip_unknown_items():
+    menu = populate_menu()
+    engine = OrderEngine()
+    engine.add_item_to_order(menu.burgers[0].clone(), 2)
+    engine.add_item_to_order(menu.burgers[1].clone())
+    order = engine.confirm_order("Ada")
+    event = OrderEvent.from_wire(
+        json.loads(json.dumps(OrderEvent.from_order(ORDER_CREATED, order).to_wire()))
+    )
+
+    # The kitchen reloaded a menu where the first item costs more and the
+    # second is gone.
+    Order.registry.clear()
+    name, price, ingredients = DEFAULT_MENU[0]
+    kitchen_menu = populate_menu([(name, price + 1, ingredients)] + DEFAULT_MENU[2:])
+    kitchen = OrderEngine()
+    received = apply_event(kitchen, kitchen_menu, event)
+    assert received.order_id in kitchen.existing_orders
+    assert [(burger.name, count) for burger, count in received.lines.items()] == [(name, 2)]
+    assert received.subtotal_cents == 2 * menu.burgers[0].price_cents
+    assert received.confirmed_at == event.sent_at
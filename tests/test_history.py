@@ -0,0 +1,62 @@
+import sqlite3
+import threading
+
+import pytest
+
+from burger import OrderEngine, populate_menu
+from burger.history import OrderHistory
+
+
+def complete_order(engine, menu, name):
+    engine.add_item_to_order(menu.burgers[0].clone(), 2)
+    order = engine.confirm_order(name)
+    return engine.order_complete(order.order_id)
+
+
+def test_completed_orders_are_stored_in_cents(tmp_path):
+    menu = populate_menu()
+    engine = OrderEngine()
+    history = OrderHistory(str(tmp_path / "history.sqlite3")).open()
+    engine.add_listener(history)
+    order = complete_order(engine, menu, "Ada")
+    history.flush()
+    entry = history.get(order.order_id)
+    assert entry.subtotal_cents == 2 * menu.burgers[0].price_cents
+    assert isinstance(entry.subtotal_cents, int)
+    assert [entry.order_id for entry in history.find(customer="ad")] == [order.order_id]
+    history.close()
+
+
+def test_float_totals_are_migrated_to_cents(tmp_path):
+    path = str(tmp_path / "history.sqlite3")
+    connection = sqlite3.connect(path)
+    connection.executescript(
+        """
+        CREATE TABLE orders (
+            order_id TEXT PRIMARY KEY, customer_name TEXT, customer_key TEXT,
+            confirmed_at REAL, completed_at REAL NOT NULL, total REAL NOT NULL,
+            item_count INTEGER NOT NULL, lines TEXT NOT NULL
+        );
+        INSERT INTO orders VALUES ('old', 'Ada', 'ada', 1.0, 2.0, 24.1, 2, '[]');
+        """
+    )
+    connection.close()
+    history = OrderHistory(path).open()
+    entry = history.get("old")
+    assert entry.subtotal_cents == 2410
+    assert [entry.order_id for entry in history.find(customer="Ada")] == ["old"]
+    history.close()
+
+
+def test_close_closes_reader_connections(tmp_path):
+    history = OrderHistory(str(tmp_path / "history.sqlite3")).open()
+    history.get("missing")
+    reader = threading.Thread(target=history.get, args=("missing",))
+    reader.start()
+    reader.join()
+    connections = list(history.reader_connections)
+    assert len(connections) == 2
+    history.close()
+    for connection in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
@@ -0,0 +1,30 @@
+from burger import OrderEngine, populate_menu
+from burger.inventory import Inventory
+
+
+def test_confirmed_stock_survives_a_save_and_load(tmp_path):
+    path = str(tmp_path / "inventory.json")
+    menu = populate_menu()
+    engine = OrderEngine()
+    inventory = Inventory(menu)
+    ingredient = menu.burgers[0].ingredients[0]
+    inventory.set_stock(ingredient, 10, threshold=2)
+    engine.add_listener(inventory)
+    engine.add_item_to_order(menu.burgers[0].clone(), 3)
+    engine.confirm_order()
+    assert inventory.dirty
+    inventory.save(path)
+    assert not inventory.dirty
+
+    restored = Inventory.load(path, menu)
+    assert restored.level(ingredient) == 7
+    assert restored.to_dict() == inventory.to_dict()
+    assert not restored.dirty
+
+
+def test_an_unreadable_inventory_tracks_nothing(tmp_path, caplog):
+    path = tmp_path / "inventory.json"
+    path.write_text('{"Arugula": {"stock": 4', encoding="utf-8")
+    inventory = Inventory.load(str(path), populate_menu())
+    assert inventory.to_dict() == {}
+    assert "could not read inventory" in caplog.text
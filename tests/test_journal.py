@@ -0,0 +1,202 @@
+import os
+
+from burger import DEFAULT_MENU, Order, OrderEngine, populate_menu
+from burger.journal import OrderJournal
+
+
+def start(directory, menu, **options):
+    # A fresh process: empty registry, recover, then journal from there.
+    Order.registry.clear()
+    engine = OrderEngine()
+    journal = OrderJournal(directory, **options)
+    journal.recover(engine, menu)
+    journal.open(engine)
+    engine.add_listener(journal)
+    return engine, journal
+
+
+def crash(journal):
+    # Stop the writer once the queue is on disk, without close()'s snapshot.
+    journal.pending.put(None)
+    journal.thread.join()
+    journal.file.close()
+
+
+def recover(directory, menu):
+    Order.registry.clear()
+    engine = OrderEngine()
+    OrderJournal(directory).recover(engine, menu)
+    return engine
+
+
+def lines(order):
+    return {burger.name: count for burger, count in order.lines.items()}
+
+
+def test_open_orders_and_the_current_order_are_recovered(tmp_path):
+    menu = populate_menu()
+    engine, journal = start(tmp_path, menu)
+    engine.add_item_to_order(menu.burgers[0].clone(), 3)
+    engine.add_item_to_order(menu.burgers[1].clone())
+    kept = engine.confirm_order("Ada")
+    engine.add_item_to_order(menu.burgers[2].clone())
+    done = engine.confirm_order("Bo")
+    engine.order_complete(done.order_id)
+    engine.add_item_to_order(menu.burgers[3].clone(), 2)
+    crash(journal)
+
+    engine = recover(tmp_path, menu)
+    assert list(engine.existing_orders) == [kept.order_id]
+    order = engine.existing_orders[kept.order_id]
+    assert order.customer_name == "Ada"
+    assert lines(order) == {menu.burgers[0].name: 3, menu.burgers[1].name: 1}
+    assert lines(engine.current_order) == {menu.burgers[3].name: 2}
+
+
+def test_set_quantity_replaces_and_zero_removes(tmp_path):
+    menu = populate_menu()
+    engine, journal = start(tmp_path, menu)
+    first = menu.burgers[0].clone()
+    second = menu.burgers[1].clone().modified(removed=["Arugula"])
+    engine.add_item_to_order(first, 2)
+    engine.add_item_to_order(first)
+    engine.add_item_to_order(second, 4)
+    engine.set_quantity(first, 5)
+    engine.set_quantity(second, 0)
+    crash(journal)
+
+    engine = recover(tmp_path, menu)
+    assert lines(engine.current_order) == {first.name: 5}
+    assert engine.current_order.subtotal_cents == 5 * first.price_cents
+
+
+def test_discarded_orders_stay_gone(tmp_path):
+    menu = populate_menu()
+    engine, journal = start(tmp_path, menu)
+    engine.add_item_to_order(menu.burgers[0].clone())
+    engine.discard_current_order()
+    crash(journal)
+
+    engine = recover(tmp_path, menu)
+    assert engine.current_order is None
+    assert not engine.existing_orders
+
+
+def test_snapshot_plus_tail(tmp_path):
+    menu = populate_menu()
+    engine, journal = start(tmp_path, menu, snapshot_every=5)
+    confirmed = []
+    for index in range(6):
+        engine.add_item_to_order(menu.burgers[index % 5].clone())
+        confirmed.append(engine.confirm_order(f"guest {index}").order_id)
+    engine.order_complete(confirmed[0])
+    crash(journal)
+    assert os.path.exists(tmp_path / "orders.snapshot")
+
+    engine = recover(tmp_path, menu)
+    assert list(engine.existing_orders) == confirmed[1:]
+
+
+def test_restart_after_a_torn_tail_keeps_later_records(tmp_path):
+    menu = populate_menu()
+    engine, journal = start(tmp_path, menu)
+    engine.add_item_to_order(menu.burgers[0].clone())
+    first = engine.confirm_order("Ada")
+    crash(journal)
+    # Power lost halfway through the next record.
+    with open(tmp_path / "orders.journal", "a", encoding="utf-8") as journal_file:
+        journal_file.write('[3,"add","torn",["The Hex')
+
+    engine, journal = start(tmp_path, menu)
+    assert list(engine.existing_orders) == [first.order_id]
+    engine.add_item_to_order(menu.burgers[1].clone())
+    second = engine.confirm_order("Bo")
+    crash(journal)
+
+    engine = recover(tmp_path, menu)
+    assert list(engine.existing_orders) == [first.order_id, second.order_id]
+    assert lines(engine.existing_orders[second.order_id]) == {menu.burgers[1].name: 1}
+
+
+def test_recovered_orders_keep_the_price_they_were_rung_up_at(tmp_path):
+    menu = populate_menu()
+    engine, journal = start(tmp_path, menu, snapshot_every=2)
+    item = menu.burgers[0]
+    engine.add_item_to_order(item.clone(), 2)
+    snapshotted = engine.confirm_order("Ada")
+    engine.add_item_to_order(item.clone())
+    journaled = engine.confirm_order("Bo")
+    crash(journal)
+
+    name, price, ingredients = DEFAULT_MENU[0]
+    repriced_menu = populate_menu([(name, price + 1.5, ingredients)] + DEFAULT_MENU[1:])
+    engine = recover(tmp_path, repriced_menu)
+    assert engine.existing_orders[snapshotted.order_id].subtotal_cents == 2 * item.price_cents
+    assert engine.existing_orders[journaled.order_id].subtotal_cents == item.price_cents
+    [burger] = engine.existing_orders[journaled.order_id].lines
+    assert burger.name == name
+    assert burger.item is not repriced_menu.find_burger(name)
+
+
+def test_journals_without_prices_use_the_menu_price(tmp_path):
+    menu = populate_menu()
+    item = menu.burgers[1]
+    (tmp_path / "orders.journal").write_text(
+        f'[1,"add","old",["{item.name}",0,0,[]]]\n'
+        f'[2,"add","old",["{item.name}",0,0,[],2]]\n'
+        '[3,"confirm","old","Ada"]\n',
+        encoding="utf-8",
+    )
+    engine = recover(tmp_path, menu)
+    order = engine.existing_orders["old"]
+    assert lines(order) == {item.name: 3}
+    assert order.subtotal_cents == 3 * item.price_cents
+    [burger] = order.lines
+    assert burger.item is item
+
+
+def test_orders_from_other_terminals_are_recovered_with_their_confirm_time(tmp_path):
+    menu = populate_menu()
+    engine, journal = start(tmp_path, menu, snapshot_every=3)
+    engine.add_item_to_order(menu.burgers[0].clone())
+    snapshotted = engine.confirm_order("Ada")
+    received = []
+    for index in range(3):
+        order = Order(f"remote {index}")
+        order.customer_name = f"guest {index}"
+        order.confirmed_at = 1000.0 + index
+        order.add_burger(menu.burgers[index + 1].clone(), index + 1)
+        received.append(engine.receive_order(order))
+    engine.order_complete(received[0].order_id, notify=False)
+    crash(journal)
+
+    engine = recover(tmp_path, menu)
+    assert list(engine.existing_orders) == [
+        snapshotted.order_id,
+        received[1].order_id,
+        received[2].order_id,
+    ]
+    assert engine.existing_orders[snapshotted.order_id].confirmed_at == snapshotted.confirmed_at
+    for order in received[1:]:
+        recovered = engine.existing_orders[order.order_id]
+        assert recovered.customer_name == order.customer_name
+        assert recovered.confirmed_at == order.confirmed_at
+        assert lines(recovered) == lines(order)
+
+
+def test_confirming_an_emptied_order_discards_it(tmp_path):
+    menu = populate_menu()
+    engine, journal = start(tmp_path, menu)
+    burger = menu.burgers[0].clone()
+    engine.add_item_to_order(burger, 2)
+    order_id = engine.current_order.order_id
+    engine.set_quantity(burger, 0)
+    assert engine.confirm_order("Ada") is None
+    assert engine.current_order is None
+    assert not engine.existing_orders
+    assert order_id not in Order.registry
+    crash(journal)
+
+    engine = recover(tmp_path, menu)
+    assert engine.current_order is None
+    assert not engine.existing_orders
@@ -0,0 +1,115 @@
+import json
+
+from burger import OrderEngine, populate_menu
+from burger.bus import (
+    ORDER_CREATED,
+    STATION_DONE,
+    OrderEvent,
+    apply_event,
+    apply_station_done,
+    decode_batch,
+    encode_batch,
+)
+from burger.kitchen import KitchenScheduler
+
+
+def over_the_wire(event):
+    frame = encode_batch([event])
+    [received] = decode_batch(frame[4:])
+    return received
+
+
+def mixed_order(menu):
+    # A patty burger for the grill and a hot dog for the fryer.
+    engine = OrderEngine()
+    engine.add_item_to_order(menu.find_burger("The Hexxor").clone())
+    engine.add_item_to_order(menu.find_burger("Hot Texan").clone(), 2)
+    return engine.confirm_order("Ada")
+
+
+def station(menu, order):
+    engine = OrderEngine()
+    apply_event(engine, menu, over_the_wire(OrderEvent.from_order(ORDER_CREATED, order)))
+    return engine, KitchenScheduler()
+
+
+def test_lines_are_routed_to_stations():
+    menu = populate_menu()
+    order = mixed_order(menu)
+    scheduler = KitchenScheduler()
+    lines = scheduler.update(order)
+    assert {line.burger.name: line.station for line in lines} == {
+        "The Hexxor": "grill",
+        "Hot Texan": "fryer",
+    }
+    assert list(scheduler.station_tickets("fryer")) == [order.order_id]
+    assert not scheduler.finish(order.order_id, "grill")
+    assert scheduler.finish(order.order_id, "fryer")
+
+
+def test_station_done_travels_with_its_station():
+    event = over_the_wire(OrderEvent.station_done("order", "grill"))
+    assert (event.kind, event.order_id, event.station) == (STATION_DONE, "order", "grill")
+    assert len(json.loads(encode_batch([OrderEvent(ORDER_CREATED, "order")])[4:])[0]) == 5
+
+
+def test_the_last_station_to_finish_sees_the_order_done():
+    menu = populate_menu()
+    order = mixed_order(menu)
+    grill_engine, grill = station(menu, order)
+    fryer_engine, fryer = station(menu, order)
+    fryer.update(fryer_engine.existing_orders[order.order_id])
+
+    grill.update(grill_engine.existing_orders[order.order_id])
+    assert not grill.finish(order.order_id, "grill")
+    done = over_the_wire(OrderEvent.station_done(order.order_id, "grill"))
+    received, finished = apply_station_done(fryer_engine, fryer, done)
+    assert received.order_id == order.order_id
+    assert not finished
+    assert not fryer.queue("grill")
+    assert fryer.finish(order.order_id, "fryer")
+
+
+def test_stations_finishing_together_both_see_the_order_done():
+    menu = populate_menu()
+    order = mixed_order(menu)
+    grill_engine, grill = station(menu, order)
+    fryer_engine, fryer = station(menu, order)
+    grill.update(grill_engine.existing_orders[order.order_id])
+    fryer.update(fryer_engine.existing_orders[order.order_id])
+    assert not grill.finish(order.order_id, "grill")
+    assert not fryer.finish(order.order_id, "fryer")
+
+    grill_done = OrderEvent.station_done(order.order_id, "grill")
+    fryer_done = OrderEvent.station_done(order.order_id, "fryer")
+    assert apply_station_done(fryer_engine, fryer, grill_done)[1]
+    assert apply_station_done(grill_engine, grill, fryer_done)[1]
+
+
+def test_station_done_before_the_rail_caught_up():
+    menu = populate_menu()
+    order = mixed_order(menu)
+    engine, scheduler = station(menu, order)
+    done = OrderEvent.station_done(order.order_id, "grill")
+    assert not apply_station_done(engine, scheduler, done)[1]
+    assert [line.burger.name for line in scheduler.queue("fryer")] == ["Hot Texan"]
+    assert apply_station_done(engine, scheduler, OrderEvent.station_done("unknown", "grill")) == (
+        None,
+        False,
+    )
+
+
+def test_a_limited_queue_is_the_head_of_the_full_one():
+    menu = populate_menu()
+    scheduler = KitchenScheduler()
+    engine = OrderEngine()
+    for index in range(30):
+        engine.add_item_to_order(menu.find_burger("The Hexxor").clone(), index % 4 + 1)
+        order = engine.confirm_order(f"guest {index}")
+        order.confirmed_at = 1000.0 - index
+        scheduler.update(order)
+    scheduler.pop("grill")
+    full = scheduler.queue("grill")
+    assert len(full) == 29
+    assert scheduler.queue("grill", 5) == full[:5]
+    assert list(scheduler.station_tickets("grill", 5)) == [line.order_id for line in full[:5]]
@@ -0,0 +1,16 @@
+from burger.refresh import RefreshScheduler
+
+
+def test_keys_reach_the_callback_in_the_order_they_were_marked():
+    flushed = []
+    refresh = RefreshScheduler()
+    refresh.register("rail", lambda keys: flushed.append(None if keys is None else list(keys)))
+    keys = [f"order {index}" for index in range(50, 0, -1)]
+    for key in keys + keys[::2]:
+        refresh.mark_dirty("rail", key)
+    refresh.flush()
+    refresh.mark_dirty("rail", keys[0])
+    refresh.mark_dirty("rail")
+    refresh.flush()
+    assert flushed == [keys, None]
+    assert refresh.stats()["rail"] == {"requested": 77, "flushed": 2, "avoided": 26}
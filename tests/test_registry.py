@@ -0,0 +1,53 @@
+import gc
+import time
+import tracemalloc
+
+from burger import Order, OrderEngine, OrderRegistry, OrderState, populate_menu
+
+
+def run_orders(engine, menu, count):
+    for index in range(count):
+        engine.add_item_to_order(menu.burgers[index % len(menu.burgers)].clone())
+        order = engine.confirm_order(f"guest {index}")
+        engine.order_complete(order.order_id)
+
+
+def test_completed_orders_are_archived_and_the_archive_is_bounded():
+    registry = OrderRegistry(completed_limit=2, archive_limit=3)
+    for index in range(8):
+        order = Order(str(index))
+        registry.register(order)
+        registry.complete(order.order_id)
+    assert list(registry.completed_orders) == ["6", "7"]
+    assert list(registry.archived_orders) == ["3", "4", "5"]
+    assert registry.state("5") == OrderState.ARCHIVED
+    assert "0" not in registry
+
+
+def test_old_completed_orders_are_archived_when_nothing_completes():
+    registry = OrderRegistry(completed_max_age=60)
+    order = Order("stale")
+    registry.register(order)
+    registry.complete("stale", now=time.time() - 120)
+    assert "stale" in registry.completed_orders
+    registry.register(Order("next"))
+    assert "stale" not in registry.completed_orders
+    assert registry.state("stale") == OrderState.ARCHIVED
+
+
+def test_memory_stays_flat_over_10k_orders():
+    menu = populate_menu()
+    engine = OrderEngine()
+    tracemalloc.start()
+    try:
+        # Fill the completed window and the archive first; both are bounded.
+        run_orders(engine, menu, 3000)
+        gc.collect()
+        before, _ = tracemalloc.get_traced_memory()
+        run_orders(engine, menu, 10_000)
+        gc.collect()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert len(Order.registry) == 2050
+    assert (after - before) / 10_000 < 64